@@ -0,0 +1,269 @@
+'''
+Stand-in for the WaniKani v1.4 API serving a synthetic inventory
+
+    python benchmarks/fakeserver.py --level 60 --latency 0.05
+    WANIKANI_BASE=<printed url> wk upcoming
+
+The inventory is generated from a seed so every run serves the same items.
+Latency and errors can be injected to see how the clients behave on a slow
+or unreliable connection.
+'''
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+# Roughly how many items of each type WaniKani has per level
+ITEMS_PER_LEVEL = {
+    'radical': 8,
+    'kanji': 34,
+    'vocabulary': 110,
+}
+
+ENDPOINT_TYPES = {
+    'radicals': 'radical',
+    'kanji': 'kanji',
+    'vocabulary': 'vocabulary',
+}
+
+# srs name for each srs_numeric stage
+SRS = ['', 'apprentice', 'apprentice', 'apprentice', 'apprentice',
+       'guru', 'guru', 'master', 'enlighten', 'burned']
+
+
+class Inventory(object):
+    '''
+    Synthetic items for a user at the given level
+
+    Levels below the user's level are mostly passed or burned, the current
+    level is in apprentice and anything above it has not been unlocked yet.
+    '''
+
+    def __init__(self, level=60, scale=1.0, seed=0, now=None):
+        self.level = level
+        self.now = int(now or time.time())
+        self.items = dict((name, []) for name in ITEMS_PER_LEVEL)
+
+        rand = random.Random(seed)
+        for name, count in ITEMS_PER_LEVEL.items():
+            for lvl in range(1, 61):
+                for i in range(max(1, int(count * scale))):
+                    self.items[name].append(self.item(rand, name, lvl, i))
+
+    def item(self, rand, name, lvl, i):
+        item = {
+            'type': name,
+            'level': lvl,
+            'character': u'{0}{1}-{2}'.format(name[0], lvl, i),
+            'meaning': u'{0} {1} {2}'.format(name, lvl, i),
+            'user_specific': None,
+        }
+        if name == 'vocabulary':
+            item['kana'] = u'かな{0}-{1}'.format(lvl, i)
+        if lvl > self.level:
+            return item
+
+        behind = self.level - lvl
+        if behind == 0:
+            srs_numeric = rand.randint(1, 4)
+        else:
+            srs_numeric = min(9, rand.randint(4, 5 + behind))
+        unlocked = self.now - (behind + 1) * 7 * 86400 + rand.randint(0, 86400)
+        burned = srs_numeric == 9
+        # Reviews land on the quarter hour like the real thing
+        available = None if burned else (
+            (self.now + rand.randint(-3600, 14 * 86400)) // 900 * 900
+        )
+        item['user_specific'] = {
+            'srs': SRS[srs_numeric],
+            'srs_numeric': srs_numeric,
+            'unlocked_date': unlocked,
+            'available_date': available,
+            'burned': burned,
+            'burned_date': unlocked + 180 * 86400 if burned else 0,
+            'meaning_correct': rand.randint(0, 40),
+            'meaning_incorrect': rand.randint(0, 5),
+            'meaning_max_streak': rand.randint(0, 20),
+            'meaning_current_streak': rand.randint(0, 20),
+            'reading_correct': rand.randint(0, 40),
+            'reading_incorrect': rand.randint(0, 5),
+            'reading_max_streak': rand.randint(0, 20),
+            'reading_current_streak': rand.randint(0, 20),
+            'meaning_note': None,
+            'reading_note': None,
+            'user_synonyms': None,
+        }
+        return item
+
+    def __len__(self):
+        return sum(len(items) for items in self.items.values())
+
+    @property
+    def user_information(self):
+        return {
+            'username': 'benchmark',
+            'gravatar': '',
+            'level': self.level,
+            'title': 'Turtles',
+            'about': '',
+            'website': None,
+            'twitter': None,
+            'topics_count': 0,
+            'posts_count': 0,
+            'creation_date': self.now - 365 * 86400,
+            'vacation_date': None,
+        }
+
+    def response(self, endpoint, argument=None):
+        '''
+        Return the decoded response for an endpoint, or None if unknown
+        '''
+        data = {'user_information': self.user_information}
+        if endpoint == 'user-information':
+            return data
+
+        if endpoint in ENDPOINT_TYPES:
+            items = self.items[ENDPOINT_TYPES[endpoint]]
+            if argument:
+                levels = set(int(lvl) for lvl in argument.split(','))
+                data['requested_information'] = [i for i in items if i['level'] in levels]
+            elif endpoint == 'vocabulary':
+                data['requested_information'] = {'general': items}
+            else:
+                data['requested_information'] = items
+            return data
+
+        unlocked = [
+            item for name in ITEMS_PER_LEVEL for item in self.items[name]
+            if item['user_specific'] is not None
+        ]
+        if endpoint == 'level-progression':
+            def passed(name):
+                return sum(
+                    1 for i in unlocked if i['type'] == name and i['level'] == self.level
+                    and i['user_specific']['srs_numeric'] >= 5
+                )
+            data['requested_information'] = {
+                'radicals_progress': passed('radical'),
+                'radicals_total': len(self.items['radical']) // 60,
+                'kanji_progress': passed('kanji'),
+                'kanji_total': len(self.items['kanji']) // 60,
+            }
+            return data
+        if endpoint == 'recent-unlocks':
+            limit = int(argument or 10)
+            recent = sorted(unlocked, key=lambda i: i['user_specific']['unlocked_date'], reverse=True)
+            data['requested_information'] = [
+                dict(i, unlocked_date=i['user_specific']['unlocked_date']) for i in recent[:limit]
+            ]
+            return data
+        if endpoint == 'critical-items':
+            percentage = int(argument or 75)
+            critical = []
+            for i in unlocked:
+                us = i['user_specific']
+                total = us['meaning_correct'] + us['meaning_incorrect']
+                score = 100 * us['meaning_correct'] // total if total else 100
+                if score < percentage:
+                    critical.append(dict(i, percentage=str(score)))
+            data['requested_information'] = critical
+            return data
+        return None
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        if server.error_rate and server.random.random() < server.error_rate:
+            return self.send(503, b'{"error": "injected"}')
+
+        # /api/v1.4/user/<api key>/<endpoint>[/<argument>]
+        parts = self.path.split('/user/', 1)[-1].strip('/').split('/')
+        if len(parts) < 2:
+            return self.send(404, b'{}')
+        key = tuple(parts[1:3])
+        body = server.responses.get(key)
+        if body is None:
+            data = server.inventory.response(*key)
+            if data is None:
+                return self.send(404, b'{}')
+            body = json.dumps(data).encode('utf8')
+            server.responses[key] = body
+        self.send(200, body)
+
+    def send(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeServer(ThreadingMixIn, HTTPServer):
+    '''
+    Serve an :class:`Inventory` like the v1.4 API
+
+    :param latency: Seconds to wait before answering each request
+    :param error_rate: Fraction of requests answered with a 503
+    '''
+    daemon_threads = True
+
+    def __init__(self, inventory, port=0, latency=0, error_rate=0, seed=0):
+        HTTPServer.__init__(self, ('127.0.0.1', port), Handler)
+        self.inventory = inventory
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        # Encoded responses, so the server is not what the benchmarks measure
+        self.responses = {}
+
+    @property
+    def base(self):
+        return 'http://127.0.0.1:{0}/api/v1.4/user/{{0}}/{{1}}'.format(self.server_address[1])
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self.base
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake WaniKani v1.4 API')
+    parser.add_argument('-p', '--port', type=int, default=0)
+    parser.add_argument('-l', '--level', type=int, default=60, help='User level (1-60)')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplier for items per level')
+    parser.add_argument('--latency', type=float, default=0, help='Seconds added to each response')
+    parser.add_argument('--error-rate', type=float, default=0, help='Fraction of requests that fail')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    inventory = Inventory(args.level, args.scale, args.seed)
+    server = FakeServer(inventory, args.port, args.latency, args.error_rate, args.seed)
+    # The first line is read by the benchmark suite
+    print(server.base)
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+'''
+Compare rendering calendars with wanikani.ics against icalendar
+
+    python benchmarks/ics_render.py [--events 500] [--runs 20]
+
+Both render the same blocker style events. Their output is checked to be
+identical before anything is timed. Requires icalendar, which wanikani
+itself no longer depends on.
+'''
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from icalendar import Calendar, Event  # noqa: E402
+
+from wanikani import ics  # noqa: E402
+
+PRODID = '-//Wanikani Blockers//github.com/kfdm/wanikani//'
+
+
+def make_events(count):
+    start = datetime.datetime(2016, 1, 1)
+    return [
+        (start + datetime.timedelta(minutes=15 * i), u'部首: {0} 漢字: {1}'.format(i % 7, i % 13))
+        for i in range(count)
+    ]
+
+
+def render_icalendar(events):
+    cal = Calendar()
+    cal.add('prodid', PRODID)
+    cal.add('version', '2.0')
+    for dtstart, summary in events:
+        event = Event()
+        event.add('summary', summary)
+        event.add('dtstart', dtstart)
+        event.add('dtend', dtstart)
+        event['uid'] = str(dtstart)
+        cal.add_component(event)
+    return cal.to_ical()
+
+
+def render_ics(events):
+    return b''.join(ics.calendar(PRODID, (
+        [
+            ('SUMMARY', summary),
+            ('DTSTART', dtstart),
+            ('DTEND', dtstart),
+            ('UID', str(dtstart)),
+        ] for dtstart, summary in events
+    )))
+
+
+def measure(func, events, runs):
+    times = []
+    for _ in range(runs):
+        start = time.time()
+        func(events)
+        times.append(time.time() - start)
+    times.sort()
+
+    peak = None
+    if tracemalloc is not None:
+        tracemalloc.start()
+        func(events)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {
+        'min': round(times[0], 6),
+        'median': round(times[len(times) // 2], 6),
+        'peak_memory': peak,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-e', '--events', type=int, default=500)
+    parser.add_argument('-r', '--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    events = make_events(args.events)
+    if render_icalendar(events) != render_ics(events):
+        sys.exit('wanikani.ics output differs from icalendar')
+
+    results = {
+        'events': args.events,
+        'icalendar': measure(render_icalendar, events, args.runs),
+        'wanikani.ics': measure(render_ics, events, args.runs),
+    }
+    results['speedup'] = round(results['icalendar']['median'] / results['wanikani.ics']['median'], 1)
+    print(json.dumps(results, indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+'''
+Measure how long `wk` takes to start for commands that should not touch the
+network, and which heavy modules get imported along the way
+
+    python benchmarks/import_time.py [--runs 20]
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should only be loaded once a subcommand needs the API
+HEAVY = ['requests', 'wanikani.core', 'wanikani.cache', 'wanikani.sync', 'tzlocal', 'numpy', 'ijson']
+
+COMMANDS = [
+    ('import', []),
+    ('help', ['--help']),
+    ('upcoming-help', ['upcoming', '--help']),
+]
+
+RUNNER = '''
+import sys
+sys.argv = ["wk"] + sys.argv[1:]
+import wanikani.cli
+if len(sys.argv) > 1:
+    try:
+        wanikani.cli.main()
+    except SystemExit:
+        pass
+sys.stderr.write(",".join(m for m in {heavy!r} if m in sys.modules))
+'''.format(heavy=HEAVY)
+
+
+def run(argv):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    start = time.time()
+    proc = subprocess.Popen(
+        [sys.executable, '-c', RUNNER] + argv,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env,
+    )
+    _, err = proc.communicate()
+    return time.time() - start, err.decode('utf8').strip().splitlines()[-1:] or ['']
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    # Bare interpreter startup, to subtract from the numbers below
+    baseline = min(_python() for _ in range(args.runs))
+
+    results = {'python': round(baseline * 1000, 1)}
+    for name, argv in COMMANDS:
+        times = []
+        for _ in range(args.runs):
+            elapsed, loaded = run(argv)
+            times.append(elapsed)
+        times.sort()
+        results[name] = {
+            'min_ms': round(times[0] * 1000, 1),
+            'median_ms': round(times[len(times) // 2] * 1000, 1),
+            'heavy_modules': [m for m in loaded[0].split(',') if m],
+        }
+    print(json.dumps(results, indent=2, sort_keys=True))
+
+
+def _python():
+    start = time.time()
+    subprocess.call([sys.executable, '-c', 'pass'])
+    return time.time() - start
+
+
+if __name__ == '__main__':
+    main()
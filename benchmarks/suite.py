@@ -0,0 +1,253 @@
+'''
+End to end benchmarks run against benchmarks/fakeserver.py
+
+    python benchmarks/suite.py --level 60 --runs 5 --output before.json
+    python benchmarks/suite.py --level 60 --runs 5 --compare before.json
+
+Each benchmark is timed over several runs, then run once more under
+tracemalloc for its peak memory. Results are written as JSON so runs from
+different releases can be diffed. The calendar benchmarks need the django
+extra installed and are reported as skipped otherwise.
+'''
+import argparse
+import collections
+import contextlib
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_KEY = 'benchmark'
+
+BENCHMARKS = collections.OrderedDict()
+
+
+def benchmark(name):
+    '''
+    Register a benchmark
+
+    The decorated function does any setup and returns the callable to time.
+    '''
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+@benchmark('query')
+def bench_query():
+    from wanikani.core import WaniKani
+    return lambda: WaniKani(API_KEY).query()
+
+
+@benchmark('query_warm')
+def bench_query_warm():
+    from wanikani.core import WaniKani
+    client = WaniKani(API_KEY, memoize=True)
+    client.query()
+    return client.query
+
+
+@benchmark('vocabulary')
+def bench_vocabulary():
+    from wanikani.core import WaniKani
+    return lambda: list(WaniKani(API_KEY).vocabulary(None))
+
+
+@benchmark('upcoming_format')
+def bench_upcoming_format():
+    from wanikani import cli
+    from wanikani.core import WaniKani
+    args = cli.build_parser().parse_args(['upcoming', '--show'])
+    queue = WaniKani(API_KEY).upcoming()
+    return lambda: args.func.__self__.format(queue, args)
+
+
+@benchmark('gource')
+def bench_gource():
+    from wanikani import cli
+    from wanikani.core import WaniKani
+    args = cli.build_parser().parse_args(['gource'])
+    return lambda: args.func(WaniKani(API_KEY), args)
+
+
+def calendar(name):
+    setup_django()
+    from django.core.cache import cache
+    from django.test import RequestFactory
+    from wanikani.django.wk import views
+
+    view = getattr(views, name).as_view()
+    factory = RequestFactory()
+
+    def run():
+        # Start cold so the responses and the render are both measured.
+        # Clients are kept on the request, so each run needs a new one
+        cache.clear()
+        response = view(factory.get('/calendar.ics'), api_key=API_KEY)
+        assert response.status_code == 200, response.status_code
+    return run
+
+
+@benchmark('blockers_calendar')
+def bench_blockers_calendar():
+    return calendar('BlockersCalendar')
+
+
+@benchmark('reviews_calendar')
+def bench_reviews_calendar():
+    return calendar('ReviewsCalendar')
+
+
+def setup_django():
+    import django
+    from django.conf import settings
+    if settings.configured:
+        return
+    settings.configure(
+        DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}},
+        INSTALLED_APPS=['django.contrib.auth', 'django.contrib.contenttypes', 'wanikani.django.wk'],
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        USE_TZ=True,
+    )
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+@contextlib.contextmanager
+def quiet():
+    # The cli benchmarks print every item
+    saved = sys.stdout
+    with open(os.devnull, 'w') as devnull:
+        sys.stdout = devnull
+        try:
+            yield
+        finally:
+            sys.stdout = saved
+
+
+def measure(func, runs):
+    times = []
+    with quiet():
+        for _ in range(runs):
+            gc.collect()
+            start = time.time()
+            func()
+            times.append(time.time() - start)
+
+        peak = None
+        if tracemalloc is not None:
+            gc.collect()
+            tracemalloc.start()
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    times.sort()
+    return {
+        'runs': runs,
+        'min': round(times[0], 6),
+        'median': round(times[len(times) // 2], 6),
+        'mean': round(sum(times) / len(times), 6),
+        'peak_memory': peak,
+    }
+
+
+def start_server(args):
+    command = [
+        sys.executable, os.path.join(ROOT, 'benchmarks', 'fakeserver.py'),
+        '--level', str(args.level),
+        '--scale', str(args.scale),
+        '--latency', str(args.latency),
+        '--error-rate', str(args.error_rate),
+    ]
+    # Run the server in its own process so it does not compete with the
+    # benchmarks for the GIL
+    server = subprocess.Popen(command, stdout=subprocess.PIPE)
+    base = server.stdout.readline().decode('utf8').strip()
+    return server, base
+
+
+def compare(old, new):
+    print('{0:<20} {1:>12} {2:>12} {3:>8}'.format('benchmark', 'before', 'after', 'change'))
+    for name, result in new['results'].items():
+        before = old['results'].get(name, {}).get('median')
+        after = result.get('median')
+        if before is None or after is None:
+            continue
+        print('{0:<20} {1:>12.4f} {2:>12.4f} {3:>7.1f}%'.format(
+            name, before, after, 100.0 * (after - before) / before
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark wanikani against a fake API')
+    parser.add_argument('-l', '--level', type=int, default=60, help='User level (1-60)')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplier for items per level')
+    parser.add_argument('--latency', type=float, default=0, help='Seconds added to each response')
+    parser.add_argument('--error-rate', type=float, default=0, help='Fraction of requests that fail')
+    parser.add_argument('-r', '--runs', type=int, default=5)
+    parser.add_argument('-o', '--output', help='Write results to this file instead of stdout')
+    parser.add_argument('-c', '--compare', help='Earlier results to compare against')
+    parser.add_argument('benchmarks', nargs='*', help='Only run these benchmarks')
+    args = parser.parse_args()
+
+    server, base = start_server(args)
+    # Set before wanikani is imported so every module picks it up
+    os.environ['WANIKANI_BASE'] = base
+    sys.path.insert(0, ROOT)
+    try:
+        from wanikani.core import WaniKani
+        # The fake server does not rate limit, and the limiter would
+        # otherwise dominate the timings
+        WaniKani.rate_limiter = None
+
+        results = collections.OrderedDict()
+        for name, setup in BENCHMARKS.items():
+            if args.benchmarks and name not in args.benchmarks:
+                continue
+            try:
+                func = setup()
+            except Exception as e:
+                results[name] = {'skipped': '{0}: {1}'.format(e.__class__.__name__, e)}
+                continue
+            results[name] = measure(func, args.runs)
+            sys.stderr.write('{0:<20} {1[median]:.4f}s\n'.format(name, results[name]))
+    finally:
+        server.terminate()
+        server.wait()
+
+    output = {
+        'meta': {
+            'python': platform.python_version(),
+            'level': args.level,
+            'scale': args.scale,
+            'latency': args.latency,
+            'error_rate': args.error_rate,
+        },
+        'results': results,
+    }
+    text = json.dumps(output, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), output)
+
+
+if __name__ == '__main__':
+    main()
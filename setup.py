@@ -10,7 +10,10 @@ setup(
     url='http://github.com/kfdm/wanikani/',
     version=__version__,
     packages=find_packages(),
-    install_requires=['requests'],
+    install_requires=[
+        'futures; python_version < "3"',
+        'requests',
+    ],
     # http://pypi.python.org/pypi?%3Aaction=list_classifiers
     classifiers=[
         'Development Status :: 3 - Alpha',
@@ -27,14 +30,23 @@ setup(
         ]
     },
     extras_require={
+        'async': [
+            'aiohttp',
+        ],
         'django': [
             'dj_database_url',
             'Django >= 1.9, < 1.10',
             'django-cache-url',
             'envdir',
-            'icalendar',
+            'msgpack',
             'python-social-auth',
             'raven',
         ],
+        'streaming': [
+            'ijson',
+        ],
+        'table': [
+            'numpy',
+        ],
     }
 )
@@ -0,0 +1,48 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from wanikani.cache import FileCache, makedirs
+
+
+class MakedirsTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def test_existing(self):
+        path = os.path.join(self.root, 'a', 'b')
+        makedirs(path)
+        makedirs(path)
+        self.assertTrue(os.path.isdir(path))
+
+    def test_other_errors(self):
+        path = os.path.join(self.root, 'file')
+        open(path, 'w').close()
+        self.assertRaises(OSError, makedirs, os.path.join(path, 'a'))
+
+    def test_concurrent_set(self):
+        # The first responses are written from several threads at once
+        cache = FileCache(os.path.join(self.root, 'cache'))
+        errors = []
+
+        def write(n):
+            try:
+                cache.set('https://example.com/{0}'.format(n), {'n': n})
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        for n in range(8):
+            self.assertEqual(cache.get('https://example.com/{0}'.format(n))['data'], {'n': n})
+
+
+if __name__ == '__main__':
+    unittest.main()
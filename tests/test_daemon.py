@@ -0,0 +1,82 @@
+import os
+import shutil
+import socket
+import stat
+import tempfile
+import unittest
+
+from wanikani import daemon
+
+
+class TrustedTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        os.chmod(self.root, 0o700)
+        self.path = os.path.join(self.root, 'daemon.sock')
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.addCleanup(self.sock.close)
+        self.sock.bind(self.path)
+        self.sock.listen(1)
+        os.chmod(self.path, 0o600)
+
+    def test_own_socket(self):
+        self.assertTrue(daemon.trusted(self.path))
+
+    def test_missing(self):
+        self.assertFalse(daemon.trusted(os.path.join(self.root, 'missing.sock')))
+
+    def test_writable_socket(self):
+        os.chmod(self.path, 0o666)
+        self.assertFalse(daemon.trusted(self.path))
+
+    def test_not_a_socket(self):
+        path = os.path.join(self.root, 'file')
+        open(path, 'w').close()
+        self.assertFalse(daemon.trusted(path))
+
+    def test_writable_directory(self):
+        os.chmod(self.root, 0o777)
+        self.assertFalse(daemon.trusted(self.path))
+        # Others cannot replace the socket in a sticky directory like /tmp
+        os.chmod(self.root, 0o777 | stat.S_ISVTX)
+        self.assertTrue(daemon.trusted(self.path))
+
+    @unittest.skipUnless(os.getuid() == 0, 'Needs root to create a socket for another user')
+    def test_other_user(self):
+        os.chown(self.path, 1, -1)
+        self.assertFalse(daemon.trusted(self.path))
+
+    def test_forward_refuses(self):
+        os.chmod(self.path, 0o666)
+        self.sock.settimeout(0.1)
+        self.assertEqual(daemon.forward('key', ['upcoming'], self.path), None)
+        # Nothing was sent to whoever created the socket
+        self.assertRaises(socket.timeout, self.sock.accept)
+
+
+class PrivateDirectoryTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def test_creates(self):
+        path = os.path.join(self.root, 'wanikani')
+        daemon.private_directory(path)
+        daemon.private_directory(path)
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode) & 0o077, 0)
+
+    def test_writable(self):
+        path = os.path.join(self.root, 'wanikani')
+        os.mkdir(path)
+        os.chmod(path, 0o777)
+        self.assertRaises(RuntimeError, daemon.private_directory, path)
+
+    def test_not_a_directory(self):
+        path = os.path.join(self.root, 'wanikani')
+        os.symlink(self.root, path)
+        self.assertRaises(RuntimeError, daemon.private_directory, path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import datetime
+import unittest
+
+from wanikani import ics
+
+
+def unfold(data):
+    return data.replace(b'\r\n ', b'')
+
+
+class EscapeTest(unittest.TestCase):
+    def test_escape(self):
+        self.assertEqual(ics.escape(u'a,b;c\\d'), u'a\\,b\\;c\\\\d')
+        self.assertEqual(ics.escape(u'one\r\ntwo\nthree'), u'one\\ntwo\\nthree')
+        self.assertEqual(ics.escape(u'漢字: 3'), u'漢字: 3')
+
+
+class FoldTest(unittest.TestCase):
+    def test_short_lines(self):
+        line = b'x' * ics.LINE_LIMIT
+        self.assertEqual(ics.fold(line), line)
+
+    def test_long_lines(self):
+        line = b'SUMMARY:' + b'x' * 200
+        folded = ics.fold(line)
+        lines = folded.split(b'\r\n')
+        self.assertTrue(len(lines) > 1)
+        for part in lines:
+            self.assertTrue(len(part) <= ics.LINE_LIMIT)
+        for part in lines[1:]:
+            self.assertTrue(part.startswith(b' '))
+        self.assertEqual(unfold(folded), line)
+
+    def test_multibyte(self):
+        line = (u'SUMMARY:' + u'漢字' * 40).encode('utf8')
+        folded = ics.fold(line)
+        for part in folded.split(b'\r\n'):
+            self.assertTrue(len(part) <= ics.LINE_LIMIT)
+            # Never split inside a character
+            part.decode('utf8')
+        self.assertEqual(unfold(folded), line)
+
+
+class ContentLineTest(unittest.TestCase):
+    def test_text(self):
+        self.assertEqual(ics.content_line('SUMMARY', u'部首: 1, 漢字: 2'), u'SUMMARY:部首: 1\\, 漢字: 2\r\n'.encode('utf8'))
+        self.assertEqual(ics.content_line('SUMMARY', u'復習 1'.encode('utf8')), u'SUMMARY:復習 1\r\n'.encode('utf8'))
+        self.assertEqual(ics.content_line('UID', 5), b'UID:5\r\n')
+
+    def test_dates(self):
+        self.assertEqual(
+            ics.content_line('DTSTART', datetime.datetime(2016, 1, 2, 3, 4, 5)),
+            b'DTSTART:20160102T030405\r\n',
+        )
+        self.assertEqual(
+            ics.content_line('DTSTART', datetime.datetime(2016, 1, 2, 3, 4, 5, tzinfo=ics.UTC)),
+            b'DTSTART:20160102T030405Z\r\n',
+        )
+        self.assertEqual(
+            ics.content_line('DTSTART', datetime.date(2016, 1, 2)),
+            b'DTSTART;VALUE=DATE:20160102\r\n',
+        )
+
+
+class CalendarTest(unittest.TestCase):
+    events = [
+        [('SUMMARY', u'漢字: {0}'.format(i)), ('DTSTART', datetime.datetime(2016, 1, 1, i % 24))]
+        for i in range(10)
+    ]
+
+    def test_calendar(self):
+        data = b''.join(ics.calendar('-//test//', self.events))
+        lines = data.split(b'\r\n')
+        self.assertEqual(lines[:3], [b'BEGIN:VCALENDAR', b'VERSION:2.0', b'PRODID:-//test//'])
+        self.assertEqual(lines[-2:], [b'END:VCALENDAR', b''])
+        self.assertEqual(lines.count(b'BEGIN:VEVENT'), 10)
+        self.assertEqual(lines.count(b'END:VEVENT'), 10)
+        self.assertEqual(lines[3:7], [
+            b'BEGIN:VEVENT',
+            u'SUMMARY:漢字: 0'.encode('utf8'),
+            b'DTSTART:20160101T000000',
+            b'END:VEVENT',
+        ])
+
+    def test_chunks(self):
+        chunks = list(ics.calendar('-//test//', self.events, chunk_size=3))
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(b''.join(chunks), b''.join(ics.calendar('-//test//', self.events)))
+
+    def test_empty(self):
+        self.assertEqual(
+            b''.join(ics.calendar('-//test//', [])),
+            b'BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//test//\r\nEND:VCALENDAR\r\n',
+        )
+
+    def test_lazy(self):
+        # Events are only read as chunks are asked for
+        read = []
+
+        def events():
+            for event in self.events:
+                read.append(event)
+                yield event
+
+        chunks = ics.calendar('-//test//', events(), chunk_size=2)
+        next(chunks)
+        self.assertEqual(len(read), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
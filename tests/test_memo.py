@@ -0,0 +1,88 @@
+import threading
+import time
+import unittest
+
+from wanikani.core import WaniKani
+
+
+class CountingWaniKani(WaniKani):
+    def __init__(self, *args, **kwargs):
+        super(CountingWaniKani, self).__init__('test', *args, **kwargs)
+        self.fetched = []
+
+    def fetch(self, url, *args, **kwargs):
+        self.fetched.append(url)
+        # Long enough for concurrent callers to overlap
+        time.sleep(0.01)
+        return {'url': url}
+
+
+class MemoTest(unittest.TestCase):
+    def test_off_by_default(self):
+        client = CountingWaniKani()
+        client.get('a')
+        client.get('a')
+        self.assertEqual(client.fetched, ['a', 'a'])
+
+    def test_memoized_block(self):
+        client = CountingWaniKani()
+        with client.memoized():
+            client.get('a')
+            client.get('a')
+            client.get('b')
+        self.assertEqual(client.fetched, ['a', 'b'])
+        # Nothing is kept once the block exits
+        client.get('a')
+        self.assertEqual(client.fetched, ['a', 'b', 'a'])
+
+    def test_nested(self):
+        client = CountingWaniKani()
+        with client.memoized():
+            with client.memoized():
+                client.get('a')
+            client.get('a')
+        self.assertEqual(client.fetched, ['a'])
+        with client.memoized():
+            client.get('a')
+        self.assertEqual(client.fetched, ['a', 'a'])
+
+    def test_concurrent(self):
+        client = CountingWaniKani()
+        with client.memoized():
+            threads = [threading.Thread(target=client.get, args=('a',)) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(client.fetched, ['a'])
+
+    def test_lifetime(self):
+        client = CountingWaniKani(memoize=True)
+        with client.memoized():
+            client.get('a')
+        client.get('a')
+        self.assertEqual(client.fetched, ['a'])
+        client.invalidate('a')
+        client.get('a')
+        self.assertEqual(client.fetched, ['a', 'a'])
+
+    def test_failures_are_retried(self):
+        client = CountingWaniKani()
+        calls = []
+
+        def fetch(url):
+            calls.append(url)
+            if len(calls) == 1:
+                raise ValueError(url)
+            return {}
+
+        client.fetch = fetch
+        with client.memoized():
+            self.assertRaises(ValueError, client.get, 'a')
+            client.get('a')
+            client.get('a')
+        self.assertEqual(calls, ['a', 'a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import datetime
+import unittest
+
+from wanikani.core import Kanji, Radical, ReviewSchedule, Vocabulary
+
+
+def item(klass, character):
+    return klass({'character': character, 'meaning': character, 'level': 1, 'user_specific': None})
+
+
+def at(hour, minute=0):
+    return datetime.datetime(2016, 1, 1, hour, minute)
+
+
+class ReviewScheduleTest(unittest.TestCase):
+    def setUp(self):
+        self.radical = item(Radical, u'一')
+        self.kanji = item(Kanji, u'二')
+        self.vocabulary = item(Vocabulary, u'三')
+        self.schedule = ReviewSchedule([
+            (at(12), self.kanji),
+            (at(9), self.radical),
+            (at(12), self.vocabulary),
+            (at(10, 30), self.kanji),
+        ])
+
+    def test_time_order(self):
+        self.assertEqual(list(self.schedule), [at(9), at(10, 30), at(12)])
+        self.assertEqual(self.schedule.keys(), [at(9), at(10, 30), at(12)])
+        self.assertEqual(self.schedule[at(12)], [self.kanji, self.vocabulary])
+        self.assertEqual(len(self.schedule), 3)
+
+    def test_counts(self):
+        self.assertEqual(self.schedule.counts[Radical], 1)
+        self.assertEqual(self.schedule.counts[Kanji], 2)
+        self.assertEqual(self.schedule.counts[Vocabulary], 1)
+        self.assertEqual(self.schedule.total(), 4)
+
+    def test_pop(self):
+        self.assertEqual(self.schedule.pop(at(12)), [self.kanji, self.vocabulary])
+        self.assertEqual(self.schedule.keys(), [at(9), at(10, 30)])
+        self.assertEqual(self.schedule.counts[Vocabulary], 0)
+        self.assertEqual(self.schedule.total(), 2)
+        self.assertEqual(self.schedule.pop(at(12), None), None)
+        self.assertRaises(KeyError, self.schedule.pop, at(12))
+        self.assertRaises(KeyError, lambda: self.schedule[at(12)])
+
+    def test_setitem_replaces(self):
+        self.schedule[at(12)] = [self.radical]
+        self.assertEqual(self.schedule[at(12)], [self.radical])
+        self.assertEqual(self.schedule.total(), 3)
+
+    def test_empty(self):
+        self.assertFalse(ReviewSchedule())
+        self.assertTrue(self.schedule)
+        self.assertEqual(ReviewSchedule().total(), 0)
+
+    def test_between(self):
+        self.assertEqual(
+            [ts for ts, _ in self.schedule.between(at(10, 30), at(12))],
+            [at(10, 30)],
+        )
+        self.assertEqual([ts for ts, _ in self.schedule.between(start=at(10))], [at(10, 30), at(12)])
+        self.assertEqual([ts for ts, _ in self.schedule.between(end=at(10))], [at(9)])
+        self.assertEqual(self.schedule.due_before(at(11)), [self.radical, self.kanji])
+
+    def test_filter(self):
+        kanji = self.schedule.filter(lambda obj: isinstance(obj, Kanji))
+        self.assertEqual(kanji.items(), [(at(10, 30), [self.kanji]), (at(12), [self.kanji])])
+        self.assertEqual(kanji.total(), 2)
+        # The original is left alone
+        self.assertEqual(self.schedule.total(), 4)
+
+    def test_rollup(self):
+        self.assertEqual(self.schedule.by_hour().keys(), [at(9), at(10), at(12)])
+        by_day = self.schedule.by_day()
+        self.assertEqual(by_day.keys(), [datetime.datetime(2016, 1, 1)])
+        self.assertEqual(by_day.total(), 4)
+
+        rolled = self.schedule.rollup_before(at(11))
+        self.assertEqual(rolled.keys(), [at(11), at(12)])
+        self.assertEqual(rolled[at(11)], [self.radical, self.kanji])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from wanikani.core import Vocabulary
+from wanikani.django.wk import serializers
+from wanikani.django.wk.serializers import CompactSerializer, PassthroughSerializer, trim
+
+VOCABULARY = {
+    'type': 'vocabulary',
+    'character': u'一つ',
+    'kana': u'ひとつ',
+    'meaning': u'one thing',
+    'level': 1,
+    'image': None,
+    'user_specific': {
+        'srs': 'burned',
+        'srs_numeric': 9,
+        'available_date': None,
+        'unlocked_date': 1400000000,
+        'burned': True,
+        'burned_date': 1410000000,
+        'meaning_correct': 12,
+        'user_synonyms': [u'a thing'],
+    },
+}
+
+RESPONSE = {
+    'user_information': {'username': 'test', 'level': 1},
+    'requested_information': {'general': [VOCABULARY, dict(VOCABULARY, user_specific=None)]},
+}
+
+
+class TrimTest(unittest.TestCase):
+    def test_drops_unused_fields(self):
+        item = trim(RESPONSE)['requested_information']['general'][0]
+        self.assertFalse('image' in item)
+        self.assertFalse('meaning_correct' in item['user_specific'])
+        self.assertFalse('user_synonyms' in item['user_specific'])
+        self.assertEqual(item['kana'], u'ひとつ')
+        self.assertEqual(item['user_specific']['burned_date'], 1410000000)
+
+    def test_items_read_the_same(self):
+        for raw, trimmed in zip(RESPONSE['requested_information']['general'],
+                                trim(RESPONSE)['requested_information']['general']):
+            before, after = Vocabulary(raw), Vocabulary(trimmed)
+            for name in Vocabulary.__slots__ + ('srs', 'srs_numeric', 'next_review', 'unlocked', 'burned'):
+                self.assertEqual(getattr(before, name), getattr(after, name))
+
+    def test_list_responses(self):
+        data = {'requested_information': [VOCABULARY]}
+        self.assertFalse('image' in trim(data)['requested_information'][0])
+
+    def test_other_responses_unchanged(self):
+        data = {'user_information': {'username': 'test'}, 'requested_information': {'level': 1}}
+        self.assertEqual(trim(data), data)
+
+    def test_original_unchanged(self):
+        trim(RESPONSE)
+        self.assertTrue('image' in RESPONSE['requested_information']['general'][0])
+
+
+class CompactSerializerTest(unittest.TestCase):
+    def setUp(self):
+        self.msgpack = serializers.msgpack
+
+    def tearDown(self):
+        serializers.msgpack = self.msgpack
+
+    def test_round_trip(self):
+        serializer = CompactSerializer(trim=False)
+        value = serializer.dumps(RESPONSE)
+        self.assertTrue(isinstance(value, bytes))
+        self.assertEqual(serializer.loads(value), RESPONSE)
+
+    def test_round_trip_json(self):
+        serializers.msgpack = None
+        serializer = CompactSerializer(trim=False)
+        value = serializer.dumps(RESPONSE)
+        self.assertEqual(value[:1], b'j')
+        self.assertEqual(serializer.loads(value), RESPONSE)
+
+    def test_reads_json_entries(self):
+        # Entries written without msgpack stay readable once it is installed
+        serializers.msgpack = None
+        value = CompactSerializer().dumps(RESPONSE)
+        serializers.msgpack = self.msgpack
+        self.assertEqual(CompactSerializer().loads(value), trim(RESPONSE))
+
+    def test_trims(self):
+        serializer = CompactSerializer()
+        self.assertEqual(serializer.loads(serializer.dumps(RESPONSE)), trim(RESPONSE))
+
+    def test_reads_passthrough_entries(self):
+        value = PassthroughSerializer().dumps(RESPONSE)
+        self.assertEqual(CompactSerializer().loads(value), RESPONSE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import time
+import unittest
+
+from wanikani.core import Kanji, Radical
+from wanikani.sync import SyncStore
+
+API_KEY = 'test'
+
+
+def item(klass, level, available_date=None):
+    return klass({
+        'character': u'{0}{1}'.format(klass.__name__, level),
+        'meaning': u'{0} {1}'.format(klass.__name__, level),
+        'level': level,
+        'user_specific': {
+            'srs': 'guru',
+            'srs_numeric': 5,
+            'available_date': available_date,
+            'unlocked_date': 1,
+            'burned': False,
+            'burned_date': 0,
+        },
+    })
+
+
+class SyncStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.store = SyncStore(':memory:')
+        self.past = int(time.time()) - 3600
+        self.future = int(time.time()) + 86400
+
+    def levels(self, klass=Radical, levels=None):
+        return [obj.level for obj in self.store.items(API_KEY, klass, levels)]
+
+    def test_never_synced(self):
+        self.assertEqual(self.store.stale_levels(API_KEY, 5), None)
+        self.assertEqual(self.store.synced(API_KEY), None)
+
+    def test_stale_levels(self):
+        self.store.replace(API_KEY, 5, None, [
+            item(Radical, 1, self.future),
+            item(Radical, 2, self.past),
+            item(Kanji, 3, self.future),
+            item(Radical, 4),
+            item(Radical, 5, self.future),
+        ])
+        self.assertTrue(self.store.synced(API_KEY))
+        # Level 2 has a review due and 5 is the current level
+        self.assertEqual(self.store.stale_levels(API_KEY, 5), [2, 5])
+        # Hints are added, but only up to the current level
+        self.assertEqual(self.store.stale_levels(API_KEY, 5, [3, 9]), [2, 3, 5])
+
+    def test_level_up(self):
+        self.store.replace(API_KEY, 3, None, [item(Radical, 3, self.future)])
+        self.assertEqual(self.store.stale_levels(API_KEY, 5), [3, 4, 5])
+
+    def test_replace_levels(self):
+        self.store.replace(API_KEY, 3, None, [
+            item(Radical, 1, self.future),
+            item(Radical, 2, self.past),
+            item(Kanji, 2, self.past),
+            item(Radical, 3, self.future),
+        ])
+        self.store.replace(API_KEY, 3, [2], [item(Radical, 2, self.future)])
+        self.assertEqual(self.levels(), [1, 2, 3])
+        self.assertEqual(self.levels(Kanji), [])
+        self.assertEqual(self.store.stale_levels(API_KEY, 3), [3])
+
+    def test_level_reset(self):
+        self.store.replace(API_KEY, 5, None, [item(Radical, lvl, self.future) for lvl in range(1, 6)])
+        self.store.replace(API_KEY, 2, [2], [item(Radical, 2, self.future)])
+        self.assertEqual(self.levels(), [1, 2])
+
+    def test_items(self):
+        self.store.replace(API_KEY, 3, None, [
+            item(Radical, 3, self.future),
+            item(Radical, 1, self.future),
+            item(Kanji, 2, self.future),
+        ])
+        self.assertEqual(self.levels(), [1, 3])
+        self.assertEqual(self.levels(levels='3'), [3])
+        self.assertEqual(self.levels(levels='1,2'), [1])
+        self.assertEqual(self.levels(Kanji), [2])
+
+        obj = next(self.store.items(API_KEY, Kanji))
+        self.assertTrue(isinstance(obj, Kanji))
+        self.assertEqual(obj.meaning, u'Kanji 2')
+
+    def test_users_are_separate(self):
+        self.store.replace(API_KEY, 1, None, [item(Radical, 1, self.future)])
+        self.assertEqual(self.store.stale_levels('other', 1), None)
+        self.assertEqual(list(self.store.items('other', Radical)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import random
+
+import aiohttp
+
+from wanikani.core import (DEFAULT_TIMEOUT, ENDPOINT_TIMEOUT, RETRY_STATUS, WANIKANI_BASE, Kanji,
+                           Radical, ReviewSchedule, Vocabulary, WaniKani, parse_endpoint, retry_after)
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['AsyncWaniKani']
+
+
+class AsyncWaniKani(object):
+    '''
+    asyncio version of :class:`wanikani.core.WaniKani`
+
+    Several clients may share a single :class:`aiohttp.ClientSession` so that
+    many users' requests are served from the same connection pool. If no
+    session is passed in, the client creates its own on the first request
+    (aiohttp needs a running event loop for that) and closes it in
+    :meth:`close`.
+
+    Requests go through the same process wide rate limiter as the threaded
+    clients and are retried the same way. Responses are not memoized or
+    cached, and no metrics are recorded.
+    '''
+    retries = WaniKani.retries
+    backoff = WaniKani.backoff
+    timeouts = ENDPOINT_TIMEOUT
+
+    mapping = {
+        'vocabulary': Vocabulary,
+        'kanji': Kanji,
+        'radical': Radical,
+    }
+
+    def __init__(self, api_key, session=None, max_workers=4):
+        '''
+        :param session: Optional shared aiohttp session
+        :param max_workers: Maximum number of requests to have in flight at
+            once when a call is split into multiple chunks
+        '''
+        self.api_key = api_key
+        self.max_workers = max_workers
+        self._owns_session = session is None
+        self.session = session
+
+    @property
+    def rate_limiter(self):
+        # Whatever the threaded clients use, so both count against one limit
+        return WaniKani.rate_limiter
+
+    async def close(self):
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def get(self, url, **kwargs):
+        '''
+        Request a url and decode the response
+
+        Connection errors, timeouts, 429 and 5xx responses are retried like
+        :meth:`wanikani.core.WaniKani.request` does
+        '''
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+        endpoint = parse_endpoint(url)
+        kwargs.setdefault('timeout', aiohttp.ClientTimeout(
+            total=self.timeouts.get(endpoint, DEFAULT_TIMEOUT)
+        ))
+        for attempt in range(self.retries + 1):
+            if self.rate_limiter is not None:
+                await asyncio.sleep(self.rate_limiter.reserve())
+
+            delay = random.uniform(0, self.backoff * 2 ** attempt)
+            try:
+                async with self.session.get(url, **kwargs) as result:
+                    if result.status not in RETRY_STATUS or attempt == self.retries:
+                        result.raise_for_status()
+                        return await result.json()
+                    logger.warning('Error requesting %s: %s', endpoint, result.status)
+                    wait = retry_after(result)
+                    if wait is not None:
+                        delay = wait
+                        if self.rate_limiter is not None:
+                            self.rate_limiter.pause(wait)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == self.retries:
+                    raise
+                logger.warning('Error requesting %s: %s', endpoint, e)
+
+            logger.debug('Retrying %s in %.2f seconds', endpoint, delay)
+            await asyncio.sleep(delay)
+
+    async def profile(self):
+        url = WANIKANI_BASE.format(self.api_key, 'user-information')
+        data = await self.get(url)
+        return data['user_information']
+
+    async def level_progress(self):
+        url = WANIKANI_BASE.format(self.api_key, 'level-progression')
+        data = await self.get(url)
+        merged = data['requested_information']
+        merged['user_information'] = data['user_information']
+        return merged
+
+    async def recent_unlocks(self, limit=10):
+        url = WANIKANI_BASE.format(self.api_key, 'recent-unlocks')
+        data = await self.get(url)
+        for item in data['requested_information']:
+            yield self.mapping[item['type']](item)
+
+    async def critical_items(self, percentage=75):
+        url = WANIKANI_BASE.format(self.api_key, 'critical-items')
+        if percentage:
+            url += '/{0}'.format(percentage)
+        data = await self.get(url)
+        for item in data['requested_information']:
+            yield self.mapping[item['type']](item)
+
+    async def radicals(self, levels=None):
+        url = WANIKANI_BASE.format(self.api_key, 'radicals')
+        if levels:
+            url += '/{0}'.format(levels)
+        data = await self.get(url)
+        for item in data['requested_information']:
+            yield Radical(item)
+
+    async def kanji(self, levels=None):
+        url = WANIKANI_BASE.format(self.api_key, 'kanji')
+        if levels:
+            url += '/{0}'.format(levels)
+        data = await self.get(url)
+        for item in data['requested_information']:
+            yield Kanji(item)
+
+    async def _vocabulary(self, levels):
+        url = WANIKANI_BASE.format(self.api_key, 'vocabulary')
+        if levels:
+            url += '/{0}'.format(levels)
+        data = await self.get(url)
+        if 'general' in data['requested_information']:
+            return [Vocabulary(item) for item in data['requested_information']['general']]
+        return [Vocabulary(item) for item in data['requested_information']]
+
+    async def vocabulary(self, levels=None):
+        if levels is not None:
+            for item in await self._vocabulary(levels):
+                yield item
+            return
+
+        # Same chunking as the split decorator in wanikani.core, but the
+        # chunks are gathered on the event loop instead of a thread pool
+        level = (await self.profile())['level']
+        chunks = max(1, level // 10)
+        baskets = [[] for _ in range(chunks)]
+        for index, lvl in enumerate(range(1, level + 1)):
+            baskets[index * chunks // level].append(str(lvl))
+
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def load_chunk(basket):
+            async with semaphore:
+                logger.debug('Loading chunk %s', basket)
+                return await self._vocabulary(','.join(basket))
+
+        for chunk in await asyncio.gather(*[load_chunk(b) for b in baskets]):
+            for item in chunk:
+                yield item
+
+    async def upcoming(self, levels=None):
+        return await self.query(levels, exclude=[u'burned'])
+
+    async def burning(self):
+        return await self.query(include=[u'enlighten'])
+
+    async def query(self, levels=None, items=[Radical, Kanji, Vocabulary], exclude=[], include=[]):
+        mapping = {
+            Radical: self.radicals,
+            Kanji: self.kanji,
+            Vocabulary: self.vocabulary
+        }
+
+        queue = ReviewSchedule()
+
+        async def collect(klass):
+            async for obj in mapping[klass](levels):
+                if exclude and obj.srs in exclude:
+                    continue
+                if include and obj.srs not in include:
+                    continue
+                if obj.next_review:
+                    queue.add(obj.next_review, obj)
+
+        await asyncio.gather(*[collect(klass) for klass in items])
+        return queue
@@ -0,0 +1,189 @@
+import errno
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+from wanikani.core import WaniKani, parse_endpoint
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['FileCache', 'FileCachedWaniKani']
+
+CACHE_PATH = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')),
+    'wanikani'
+)
+
+# How long (in seconds) a cached response is used without asking the server
+# again. Item lists only change when reviews are done so they can be kept a
+# little longer than the profile.
+DEFAULT_TTL = 300
+ENDPOINT_TTL = {
+    'user-information': 300,
+    'level-progression': 300,
+    'recent-unlocks': 300,
+    'critical-items': 600,
+    'radicals': 900,
+    'kanji': 900,
+    'vocabulary': 900,
+}
+
+# Atomically move a file over another. Python 2 only has os.rename, which
+# can replace an existing file everywhere except Windows
+try:
+    replace = os.replace
+except AttributeError:
+    replace = os.rename
+
+
+def makedirs(path):
+    '''
+    Create a directory unless it already exists
+
+    Several threads can write the first responses at once, so another one
+    may create it between checking and creating.
+    '''
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+# Size bound for the whole cache directory before the least recently used
+# responses are removed
+DEFAULT_MAX_SIZE = 50 * 1024 * 1024
+
+
+class FileCache(object):
+    '''
+    Store API responses on disk, one JSON file per url
+
+    Files are named after a hash of the url so that API keys do not show up in
+    the cache directory. The modification time of each file is bumped when it
+    is read, which lets :meth:`evict` drop the least recently used entries.
+    '''
+
+    def __init__(self, path=CACHE_PATH, ttl=None, max_size=DEFAULT_MAX_SIZE):
+        self.path = path
+        self.ttl = dict(ENDPOINT_TTL, **(ttl or {}))
+        self.max_size = max_size
+
+    def filename(self, url):
+        return os.path.join(self.path, hashlib.sha1(url.encode('utf8')).hexdigest() + '.json')
+
+    def expires(self, url):
+        return self.ttl.get(parse_endpoint(url), DEFAULT_TTL)
+
+    def get(self, url):
+        filename = self.filename(url)
+        try:
+            with open(filename) as f:
+                entry = json.load(f)
+            os.utime(filename, None)
+        except (IOError, OSError, ValueError):
+            return None
+        entry['fresh'] = time.time() - entry['fetched'] < self.expires(url)
+        return entry
+
+    def set(self, url, data, etag=None, last_modified=None):
+        makedirs(self.path)
+        entry = {
+            'fetched': time.time(),
+            'etag': etag,
+            'last_modified': last_modified,
+            'data': data,
+        }
+        # Write to a temporary file first so a concurrent reader never sees a
+        # partially written response
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        replace(tmp, self.filename(url))
+        self.evict()
+
+    def revalidated(self, url, entry):
+        self.set(url, entry['data'], entry['etag'], entry['last_modified'])
+
+    def evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.path):
+            if not name.endswith('.json'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.path, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+
+        for mtime, size, name in sorted(entries):
+            if total <= self.max_size:
+                break
+            logger.debug('Evicting %s from cache', name)
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        if not os.path.exists(self.path):
+            return
+        for name in os.listdir(self.path):
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.path, name))
+
+
+class FileCachedWaniKani(WaniKani):
+    '''
+    WaniKani client that keeps responses in a :class:`FileCache`
+
+    Fresh responses are returned without any network traffic. Once an entry
+    is stale it is revalidated with If-None-Match/If-Modified-Since when the
+    server gave us an ETag or Last-Modified header, so an unchanged response
+    only costs a 304.
+    '''
+
+    def __init__(self, api_key, cache=None, **kwargs):
+        super(FileCachedWaniKani, self).__init__(api_key, **kwargs)
+        self.cache = cache or FileCache()
+
+    def fetch(self, url, *args, **kwargs):
+        entry = self.cache.get(url)
+        if entry is not None and entry['fresh']:
+            logger.info('Found cache for %s', parse_endpoint(url))
+            if self.metrics is not None:
+                self.metrics.inc('wanikani_cache_total', endpoint=parse_endpoint(url), result='hit')
+            return entry['data']
+
+        headers = kwargs.pop('headers', {})
+        if entry is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        result = self.request(url, *args, headers=headers, **kwargs)
+        if entry is not None and result.status_code == 304:
+            logger.info('Revalidated cache for %s', parse_endpoint(url))
+            if self.metrics is not None:
+                self.metrics.inc('wanikani_cache_total', endpoint=parse_endpoint(url), result='revalidated')
+            self.cache.revalidated(url, entry)
+            return entry['data']
+
+        result.raise_for_status()
+        if self.metrics is not None:
+            self.metrics.inc('wanikani_cache_total', endpoint=parse_endpoint(url), result='miss')
+        data = result.json()
+        logger.info('Caching for %s', parse_endpoint(url))
+        self.cache.set(
+            url, data,
+            etag=result.headers.get('ETag'),
+            last_modified=result.headers.get('Last-Modified'),
+        )
+        return data
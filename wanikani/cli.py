@@ -1,29 +1,24 @@
 import argparse
 import datetime
-
 import logging
 import os
+import sys
 
-# If the tzlocal package is installed, then we will help the user out
-# and print things out in the local timezone
-LOCAL_TIMEZONE = None
-try:
-    import tzlocal
-    LOCAL_TIMEZONE = tzlocal.get_localzone()
-except ImportError:
-    pass
-
-from wanikani.core import WaniKani, Radical, Kanji, Vocabulary
+# wk is run from shell prompts and status bars, so anything that pulls in
+# requests (wanikani.core and the clients built on it) is only imported by
+# the subcommands that talk to the API
 
 CONFIG_PATH = os.path.join(os.path.expanduser('~'), '.wanikani')
 
 logger = logging.getLogger(__name__)
 
-# Setup tomorrow for use in filtering
-tomorrow = datetime.datetime.today().replace(
-    hour=0, minute=0, second=0, microsecond=0) + datetime.timedelta(days=1)
-if LOCAL_TIMEZONE:
-    tomorrow.replace(tzinfo=LOCAL_TIMEZONE)
+
+def tomorrow():
+    '''
+    Return midnight at the start of tomorrow, for use in filtering
+    '''
+    return datetime.datetime.today().replace(
+        hour=0, minute=0, second=0, microsecond=0) + datetime.timedelta(days=1)
 
 
 def config():
@@ -35,6 +30,12 @@ def config():
 
 
 class Subcommand(object):
+    #: Set to False for subcommands that never talk to the API
+    needs_client = True
+    #: Set to False for subcommands that download more than is worth
+    #: keeping in memory until they finish
+    memoize = True
+
     def __init__(self, subparser):
         self.parser = subparser.add_parser(self.name, help=self.help)
         self.parser.set_defaults(func=self.execute)
@@ -63,7 +64,7 @@ class LevelProgress(Subcommand):
 
     def execute(self, client, args):
         p = client.level_progress()
-        print(['user_information']['username'], 'level', p['user_information']['level'])
+        print(p['user_information']['username'], 'level', p['user_information']['level'])
         print('Radicals: {0}/{1}'.format(p['radicals_progress'], p['radicals_total']))
         print('Kanji: {0}/{1}'.format(p['kanji_progress'], p['kanji_total']))
 
@@ -94,6 +95,8 @@ class Upcoming(Subcommand):
         self.parser.add_argument('-d', '--day', action='store_true')
 
     def execute(self, client, args):
+        from wanikani.core import Vocabulary
+
         level = None
         if args.current or args.blocker:
             level = client.profile()['level']
@@ -103,46 +106,39 @@ class Upcoming(Subcommand):
         if args.current or args.blocker:
             print('Showing upcoming items for level', level)
             logger.info('Filtering out items that are not level %s', level)
-            for ts in queue.keys():
-                keep = []
-                for item in queue[ts]:
-                    if args.blocker and isinstance(item, Vocabulary):
-                        logger.debug('Filtered out %s (Vocabulary)', item)
-                        continue
 
-                    if args.blocker and item.srs != u'apprentice':
-                        logger.debug('Filtered out %s (srs %s)', str(item), str(item.srs))
-                        continue
+            def keep(item):
+                if args.blocker and isinstance(item, Vocabulary):
+                    logger.debug('Filtered out %s (Vocabulary)', item)
+                    return False
+
+                if args.blocker and item.srs != u'apprentice':
+                    logger.debug('Filtered out %s (srs %s)', str(item), str(item.srs))
+                    return False
 
-                    if item['level'] != level:
-                        logger.debug('Filtered out %s (level %d)', item, item['level'])
-                        continue
+                if item.level != level:
+                    logger.debug('Filtered out %s (level %d)', item, item.level)
+                    return False
 
-                    keep.append(item)
+                return True
 
-                queue[ts] = keep
+            queue = queue.filter(keep)
 
         if args.day:
-            newqueue = {}
-            for ts in queue.keys():
-                newts = ts.replace(hour=0, minute=0, second=0, microsecond=0)
-                newqueue[newts] = queue.pop(ts)
-            queue = newqueue
+            queue = queue.by_day()
 
         if args.rollup:
             now = datetime.datetime.now().replace(microsecond=0)
             # now += datetime.timedelta(hours=5) #  Future date for testing
-            rollup = []
-            for ts in queue.keys():
-                if ts < now:
-                    rollup += queue.pop(ts)
-            if rollup:
-                queue[now] = rollup
+            if queue.between(end=now):
+                queue = queue.rollup_before(now)
                 print('Rolled up reviews')
 
         self.format(queue, args)
 
     def format(self, queue, args):
+        from wanikani.core import Kanji, Radical, Vocabulary
+
         counter = 0
         print(self.formatter.format('Timestamp', 'Radicals', 'Kanji', 'Vocab', 'Total'))
         totals = {
@@ -151,41 +147,36 @@ class Upcoming(Subcommand):
             Vocabulary: 0,
             'total': 0,
         }
-        for ts in sorted(queue):
-            if args.today:
-                if ts >= tomorrow:
-                    logger.debug('Skipping future dates %s', ts)
-                    continue
+        # The schedule is already in time order, so --today is just a range
+        entries = queue.between(end=tomorrow()) if args.today else queue.items()
+        for ts, objs in entries:
             if args.limit and counter == args.limit:
                 break
-            if len(queue[ts]):
-                counter += 1
-                counts = {
-                    Radical: 0,
-                    Kanji: 0,
-                    Vocabulary: 0,
-                }
-
-                for obj in queue[ts]:
-                    totals['total'] += 1
-                    counts[obj.__class__] += 1
-                    totals[obj.__class__] += 1
-
-                if LOCAL_TIMEZONE:
-                    ts.replace(tzinfo=LOCAL_TIMEZONE)
-                # Note the trailing commas,
-                # We only want a newline for the last one
-                print(self.formatter.format(
-                    str(ts),
-                    counts[Radical],
-                    counts[Kanji],
-                    counts[Vocabulary],
-                    len(queue[ts]),
-                ))
-
-                if args.show:
-                    print('\t',)
-                    print(', '.join([str(x) for x in queue[ts]]))
+            counter += 1
+            counts = {
+                Radical: 0,
+                Kanji: 0,
+                Vocabulary: 0,
+            }
+
+            for obj in objs:
+                totals['total'] += 1
+                counts[obj.__class__] += 1
+                totals[obj.__class__] += 1
+
+            # Note the trailing commas,
+            # We only want a newline for the last one
+            print(self.formatter.format(
+                str(ts),
+                counts[Radical],
+                counts[Kanji],
+                counts[Vocabulary],
+                len(objs),
+            ))
+
+            if args.show:
+                print('\t',)
+                print(', '.join([str(x) for x in objs]))
         print(self.formatter.format(
             'Totals',
             totals[Radical],
@@ -198,6 +189,7 @@ class Upcoming(Subcommand):
 class SetAPIKey(Subcommand):
     name = 'set_key'
     help = 'Set API Key'
+    needs_client = False
 
     def add_parsers(self):
         self.parser.add_argument('api_key', help="New API Key")
@@ -222,6 +214,13 @@ class Gourse(Subcommand):
             help="Group by level",
             action='store_true',
         )
+        self.parser.add_argument(
+            '-u', '--user',
+            dest='users',
+            action='append',
+            default=[],
+            help='API key of another account to include in the log',
+        )
 
     colors = {
         'Vocabulary': '882D9E',
@@ -231,46 +230,93 @@ class Gourse(Subcommand):
 
     burned = '434343'
 
+    #: Levels requested at once while streaming the log
+    levels_per_request = 10
+    #: Chunks are dropped as soon as their events are written, so there is
+    #: no need to keep every response until the log is finished
+    memoize = False
+
+    def events(self, items, username, args):
+        '''
+        Yield the unlock and burn events for a list of items
+        '''
+        for item in items:
+            if item.unlocked is None:
+                # Not unlocked yet so nothing to log
+                continue
+            try:
+                path = '{0}/{1}'.format(
+                    item.level if args.group else item.__class__.__name__,
+                    item,
+                )
+            except UnicodeDecodeError:
+                continue
+            yield (item.unlocked, username, 'A', path, self.colors[item.__class__.__name__])
+            if item.srs == u'burned' and item.burned:
+                yield (item.burned, username, 'M', path, self.burned)
+
+    def stream(self, client, username, chunks, args, executor):
+        '''
+        Return a generator of one account's unlocks and burns in time order
+
+        Levels are fetched a few at a time, with the next request running
+        while events from the last one are written. Nothing from a level can
+        be unlocked, let alone burned, before that level was reached, so once
+        the first unlock of the newest level fetched is known every event
+        before that point can be written.
+        '''
+        import heapq
+
+        def fetch(chunk):
+            return list(client.iter_items(','.join(str(lvl) for lvl in chunk)))
+
+        # Started here rather than in the generator so every stream begins
+        # downloading at once
+        future = executor.submit(fetch, chunks[0]) if chunks else None
+
+        def generate(future):
+            pending = []
+            for i, chunk in enumerate(chunks):
+                items = future.result()
+                if i + 1 < len(chunks):
+                    future = executor.submit(fetch, chunks[i + 1])
+
+                for event in self.events(items, username, args):
+                    heapq.heappush(pending, event)
+
+                started = [item.unlocked for item in items if item.level == chunk[-1] and item.unlocked]
+                if started:
+                    start = min(started)
+                    while pending and pending[0][0] < start:
+                        yield heapq.heappop(pending)
+
+            while pending:
+                yield heapq.heappop(pending)
+
+        return generate(future)
+
     def execute(self, client, args):
-        log = []
-        profile = client.profile()
+        import concurrent.futures
+        import heapq
 
-        mapping = {
-            Radical: client.radicals,
-            Kanji: client.kanji,
-            Vocabulary: client.vocabulary
-        }
+        clients = [client] + [client.__class__(api_key) for api_key in args.users]
+
+        # One stream per account, each with at most one request waiting
+        with concurrent.futures.ThreadPoolExecutor(len(clients)) as executor:
+            streams = []
+            for client, profile in zip(clients, executor.map(lambda client: client.profile(), clients)):
+                if args.levels:
+                    levels = sorted(set(int(lvl) for lvl in args.levels.split(',')))
+                else:
+                    levels = list(range(1, profile['level'] + 1))
+                chunks = [
+                    levels[i:i + self.levels_per_request]
+                    for i in range(0, len(levels), self.levels_per_request)
+                ]
+                streams.append(self.stream(client, profile['username'], chunks, args, executor))
 
-        for klass in mapping:
-            for item in mapping[klass](args.levels):
-                try:
-                    string = '{0}|{1}|{2}|{3}/{4}|{5}'.format(
-                        item.unlocked,
-                        profile['username'],
-                        'A',
-                        item['level'] if args.group else item.__class__.__name__,
-                        item,
-                        self.colors[item.__class__.__name__],
-                    )
-                    log.append(string)
-
-                    if item.srs == u'burned':
-                        string = '{0}|{1}|{2}|{3}/{4}|{5}'.format(
-                            item.burned,
-                            profile['username'],
-                            'M',
-                            item['level'] if args.group else item.__class__.__name__,
-                            item,
-                            self.burned,
-                        )
-                        log.append(string)
-                except UnicodeDecodeError:
-                    pass
-                except TypeError:
-                    pass
-
-        for item in sorted(log):
-            print(item)
+            for event in heapq.merge(*streams):
+                print('{0}|{1}|{2}|{3}|{4}'.format(*event))
 
 
 class Burning(Upcoming):
@@ -297,6 +343,8 @@ class Blocker(Upcoming):
         self.parser.set_defaults(today=False, limit=False)
 
     def execute(self, client, args):
+        from wanikani.core import Kanji, Radical
+
         profile = client.profile()
         queue = client.query(
             levels=profile['level'],
@@ -322,18 +370,96 @@ class Critical(Subcommand):
             print(self.format_text.format(item=item))
 
 
-def main():
+class Forecast(Subcommand):
+    name = 'forecast'
+    help = 'Project the number of reviews for the coming weeks'
+    formatter = '{0:<20} {1:>10} {2:>10}'
+
+    def add_parsers(self):
+        self.parser.add_argument('-w', '--weeks', type=int, default=4)
+        self.parser.add_argument(
+            '--accuracy', type=float, default=0.85,
+            help='Chance of answering each review correctly',
+        )
+        self.parser.add_argument(
+            '-t', '--trials', type=int, default=100,
+            help='Number of simulations to average over',
+        )
+        self.parser.add_argument('--seed', type=int)
+        self.parser.add_argument('--hourly', action='store_true')
+
+    def execute(self, client, args):
+        result = client.forecast(
+            weeks=args.weeks,
+            accuracy=args.accuracy,
+            trials=args.trials,
+            seed=args.seed,
+        )
+        if args.hourly:
+            print(self.formatter.format('Timestamp', 'Reviews', '').rstrip())
+            for ts, mean in result.by_hour().items():
+                if round(mean):
+                    print(self.formatter.format(str(ts), round(mean), '').rstrip())
+            return
+
+        high = result.percentile(90)
+        print(self.formatter.format('Date', 'Reviews', '90%'))
+        for day, mean in result.by_day().items():
+            print(self.formatter.format(str(day), round(mean), round(high[day])))
+
+
+class Daemon(Subcommand):
+    name = 'daemon'
+    help = 'Keep a client running in the background for other wk commands'
+    needs_client = False
+
+    def add_parsers(self):
+        self.parser.add_argument(
+            '-i', '--interval', type=int,
+            help='Seconds between refreshes',
+        )
+
+    def execute(self, client, args):
+        from wanikani import daemon
+
+        server = daemon.Daemon(
+            args.api_key,
+            # Every refresh builds a new client, so responses are only kept
+            # until the next one
+            lambda: get_client(args, memoize=True),
+            build_parser(),
+            interval=args.interval or daemon.DEFAULT_INTERVAL,
+        )
+        server.serve()
+
+
+def build_parser():
     parser = argparse.ArgumentParser()
     subparsers = parser.add_subparsers()
 
     # Global Options
     parser.add_argument('-a', '--api-key', default=config())
+    parser.add_argument(
+        '--cache',
+        action='store_true',
+        help='Cache responses under $XDG_CACHE_HOME/wanikani',
+    )
+    parser.add_argument(
+        '--sync',
+        action='store_true',
+        help='Read items from a local copy only refreshing what may have changed',
+    )
     parser.add_argument(
         '-d', '--debug',
         action='store_const',
         const=logging.DEBUG,
         default=logging.WARNING
     )
+    parser.add_argument(
+        '--no-daemon',
+        action='store_true',
+        help='Do not send the command to a running wk daemon',
+    )
 
     # Add our sub commands
     Profile(subparsers)
@@ -345,8 +471,48 @@ def main():
     Burning(subparsers)
     Blocker(subparsers)
     Critical(subparsers)
+    Forecast(subparsers)
+    Daemon(subparsers)
+    return parser
+
 
-    args = parser.parse_args()
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    parser = build_parser()
+    args = parser.parse_args(argv)
     logging.basicConfig(level=args.debug)
-    client = WaniKani(args.api_key)
-    args.func(client, args)
+    if not hasattr(args, 'func'):
+        parser.print_help()
+        return
+
+    if not args.func.__self__.needs_client:
+        return args.func(None, args)
+
+    if not args.no_daemon:
+        from wanikani import daemon
+        response = daemon.forward(args.api_key, argv)
+        if response is not None:
+            sys.stdout.write(response['stdout'])
+            sys.stderr.write(response['stderr'])
+            if response['status']:
+                sys.exit(response['status'])
+            return
+
+    client = get_client(args)
+    if not args.func.__self__.memoize:
+        return args.func(client, args)
+    # Commands often ask for the profile and then items that need it again
+    with client.memoized():
+        args.func(client, args)
+
+
+def get_client(args, **kwargs):
+    if args.sync:
+        from wanikani.sync import SyncedWaniKani
+        return SyncedWaniKani(args.api_key, **kwargs)
+    if args.cache:
+        from wanikani.cache import FileCachedWaniKani
+        return FileCachedWaniKani(args.api_key, **kwargs)
+    from wanikani.core import WaniKani
+    return WaniKani(args.api_key, **kwargs)
@@ -1,15 +1,187 @@
+import bisect
 import collections
+import concurrent.futures
+import contextlib
 import datetime
+import email.utils
+import itertools
 import json
 import logging
+import os
+import random
+import threading
+import time
 
 import requests
 
+# If ijson is installed then large list responses can be parsed as they are
+# downloaded instead of loading the entire body first
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 logger = logging.getLogger(__name__)
 
-__all__ = ['WaniKani', 'Radical', 'Kanji', 'Vocabulary']
+__all__ = ['WaniKani', 'Radical', 'Kanji', 'Vocabulary', 'ReviewSchedule']
+
+# Can be pointed somewhere else, such as the fake server in benchmarks/
+WANIKANI_BASE = os.environ.get(
+    'WANIKANI_BASE',
+    'https://www.wanikani.com/api/v1.4/user/{0}/{1}'
+)
+
+
+def parse_endpoint(url):
+    '''
+    Return the endpoint name (user-information, vocabulary, ...) for a url
+    built from WANIKANI_BASE
+    '''
+    try:
+        return url.split('/user/', 1)[1].split('/')[1]
+    except IndexError:
+        return None
+
+
+# Responses that are worth trying again after a short wait
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+# Seconds to wait for each endpoint before giving up on a request. Item lists
+# can be large so they get a little longer.
+DEFAULT_TIMEOUT = 10
+ENDPOINT_TIMEOUT = {
+    'radicals': 30,
+    'kanji': 30,
+    'vocabulary': 60,
+}
+
+
+class RateLimiter(object):
+    '''
+    Token bucket limiting how quickly requests are sent
+
+    A single limiter is shared by every client in the process so fan-out jobs
+    stay under the upstream limit no matter how many clients they create.
+    '''
+
+    def __init__(self, rate=10, burst=None):
+        '''
+        :param rate: Requests allowed per second on average
+        :param burst: Requests allowed at once after a quiet period.
+            Defaults to two seconds' worth.
+        '''
+        self.rate = rate
+        self.burst = burst or max(1, int(rate * 2))
+        self.tokens = self.burst
+        self.updated = time.time()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.time()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def reserve(self):
+        '''
+        Take a token without blocking and return the seconds to wait before
+        using it, for callers that must not sleep in :meth:`acquire`
+        '''
+        with self.lock:
+            now = time.time()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return max(0, self.paused_until - now, -self.tokens / self.rate)
+
+    def pause(self, seconds):
+        '''
+        Stop handing out tokens for a while, for example after the server
+        answers with Retry-After
+        '''
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.time() + seconds)
+
+
+def default_rate_limiter():
+    '''
+    Return the limiter configured by WANIKANI_RATE_LIMIT (requests per
+    second) and WANIKANI_RATE_BURST, or None if no limit is set
 
-WANIKANI_BASE = 'https://www.wanikani.com/api/v1.4/user/{0}/{1}'
+    There is no limit by default. 429 responses are retried either way, and
+    a process handling many users would otherwise be capped at one user's
+    share of requests.
+    '''
+    rate = float(os.environ.get('WANIKANI_RATE_LIMIT') or 0)
+    if not rate:
+        return None
+    return RateLimiter(rate, int(os.environ.get('WANIKANI_RATE_BURST') or 0))
+
+
+rate_limiter = default_rate_limiter()
+
+# requests keeps connections alive and asks for gzip by default, so sharing a
+# session between clients is enough to reuse connections across them
+DEFAULT_POOL_SIZE = 32
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def configure_session(name='default', pool_size=DEFAULT_POOL_SIZE, pool_connections=10):
+    '''
+    Create (or replace) a shared session in the registry
+
+    :param name: Registry name, so separate pools can be kept apart
+    :param pool_size: Connections kept open per host. Should be at least the
+        number of threads sending requests at once.
+    :param pool_connections: Number of hosts to keep pools for
+    '''
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_size,
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    with _sessions_lock:
+        old = _sessions.get(name)
+        _sessions[name] = session
+    if old is not None:
+        old.close()
+    return session
+
+
+def get_session(name='default'):
+    '''
+    Return the shared session from the registry, creating it if needed
+    '''
+    with _sessions_lock:
+        session = _sessions.get(name)
+    return session or configure_session(name)
+
+
+def retry_after(result):
+    '''
+    Parse the Retry-After header of a response into seconds
+    '''
+    value = result.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0, float(value))
+    except ValueError:
+        pass
+    parsed = email.utils.parsedate_tz(value)
+    if parsed is None:
+        return None
+    return max(0, email.utils.mktime_tz(parsed) - time.time())
 
 
 def split(func):
@@ -29,17 +201,34 @@ def split(func):
             length = ceiling if x_i < stepdown else floor
             yield [next(items) for _ in range(length)]
 
-    def wrapper(self, levels):
+    def load_chunk(self, basket):
+        logger.debug('Loading chunk %s', basket)
+        return list(func(self, ','.join([str(i) for i in basket])))
+
+    def wrapper(self, levels=None):
         # If levels is None, then we're getting all levels for the user
         # and may need to split it up into multiple queries to avoid timeouts
         if levels is None:
             logger.debug('Splitting levels %s', levels)
             level = self.profile()['level']
-            step = level / 10
-            for basket in iter_baskets_contiguous(range(1, level + 1), step):
-                logger.debug('Loading chunk %s', basket)
-                for item in func(self, ','.join([str(i) for i in basket])):
-                    yield item
+            step = max(1, level // 10)
+            baskets = list(iter_baskets_contiguous(range(1, level + 1), step))
+            if self.streaming:
+                # Loading chunks in parallel would mean holding all of them
+                # in memory, so when streaming we read them one at a time
+                for basket in baskets:
+                    logger.debug('Streaming chunk %s', basket)
+                    for item in func(self, ','.join([str(i) for i in basket])):
+                        yield item
+                return
+            # Chunks are fetched concurrently, but we still yield the results
+            # in level order by waiting on each future in turn
+            workers = min(self.max_workers, len(baskets))
+            with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+                futures = [executor.submit(load_chunk, self, basket) for basket in baskets]
+                for future in futures:
+                    for item in future.result():
+                        yield item
         else:
             for item in func(self, levels):
                 yield item
@@ -47,81 +236,517 @@ def split(func):
 
 
 class BaseObject(object):
-    def __init__(self, raw):
-        self.raw = raw
-
-    @property
-    def next_review(self):
-        if self.raw['user_specific'] is None:
-            return None
-        return datetime.datetime.fromtimestamp(
-            self.raw['user_specific']['available_date']
-        )
-
-    @property
-    def unlocked(self):
-        return self.raw['user_specific']['unlocked_date']
-
-    @property
-    def burned(self):
-        if self.raw['user_specific']['burned']:
-            return self.raw['user_specific']['burned_date']
-        return None
+    '''
+    A single WaniKani item
+
+    The fields we use most often are decoded once when the object is created
+    and kept in slots, so reading them repeatedly (as query() does) is cheap.
+    Passing keep_raw=False drops the original response dict to save memory;
+    :attr:`raw` then rebuilds an equivalent dict from the decoded fields when
+    it is asked for.
+    '''
+
+    __slots__ = (
+        '_raw',
+        'character',
+        'meaning',
+        'level',
+        'srs',
+        'srs_numeric',
+        'next_review',
+        'unlocked',
+        'burned',
+    )
+
+    def __init__(self, raw, keep_raw=True):
+        self._raw = raw if keep_raw else None
+        self.character = raw.get('character')
+        self.meaning = raw.get('meaning')
+        self.level = raw.get('level')
+
+        user_specific = raw.get('user_specific')
+        if user_specific is None:
+            # Likely an object that has not been learned yet
+            self.srs = None
+            self.srs_numeric = 0
+            self.next_review = None
+            self.unlocked = None
+            self.burned = None
+        else:
+            self.srs = user_specific['srs']
+            self.srs_numeric = user_specific.get('srs_numeric') or 0
+            self.next_review = datetime.datetime.fromtimestamp(
+                user_specific['available_date']
+            ) if user_specific.get('available_date') is not None else None
+            self.unlocked = user_specific.get('unlocked_date')
+            self.burned = user_specific['burned_date'] if user_specific.get('burned') else None
 
     @property
-    def srs(self):
-        try:
-            return self.raw['user_specific']['srs']
-        except TypeError:
-            # Likely an object that has not been learned yet
-            return None
+    def type(self):
+        return self.__class__.__name__.lower()
 
     @property
-    def srs_numeric(self):
-        try:
-            return self.raw['user_specific']['srs_numeric']
-        except (AttributeError, TypeError):
-            return 0
+    def raw(self):
+        if self._raw is not None:
+            return self._raw
+        raw = {
+            'type': self.type,
+            'character': self.character,
+            'meaning': self.meaning,
+            'level': self.level,
+            'user_specific': None,
+        }
+        if self.srs is not None:
+            raw['user_specific'] = {
+                'srs': self.srs,
+                'srs_numeric': self.srs_numeric,
+                'available_date': int(time.mktime(self.next_review.timetuple()))
+                if self.next_review else None,
+                'unlocked_date': self.unlocked,
+                'burned': self.burned is not None,
+                'burned_date': self.burned or 0,
+            }
+        return raw
 
     def __getitem__(self, key):
-        if key in self.raw:
-            return self.raw[key]
-        if self.raw['user_specific'] is not None:
-            return self.raw['user_specific'][key]
+        raw = self.raw
+        if key in raw:
+            return raw[key]
+        if raw['user_specific'] is not None:
+            return raw['user_specific'][key]
 
     def __str__(self):
-        return self.raw['character']
+        return self.character
+
 
 class Radical(BaseObject):
+    __slots__ = ()
+
     def __repr__(self):
-        if self.raw['character']:
-            return '<Radical: {0}>'.format(self.raw['character'].encode('utf8'))
+        if self.character:
+            return '<Radical: {0}>'.format(self.character.encode('utf8'))
         # Some characters do not have a unicode representation
         return '<Radical: No Unicode>'
 
 
 class Kanji(BaseObject):
+    __slots__ = ()
+
     def __repr__(self):
-        return '<Kanji: {0}>'.format(self.raw['character'].encode('utf8'))
+        return '<Kanji: {0}>'.format(self.character.encode('utf8'))
 
 
 class Vocabulary(BaseObject):
+    __slots__ = ('kana',)
+
+    def __init__(self, raw, keep_raw=True):
+        super(Vocabulary, self).__init__(raw, keep_raw)
+        self.kana = raw.get('kana')
+
+    @property
+    def raw(self):
+        raw = super(Vocabulary, self).raw
+        if self._raw is None:
+            raw['kana'] = self.kana
+        return raw
+
     def __str__(self):
-        return '{0} [{1}]'.format(self.raw['character'], self.raw['kana'])
+        return '{0} [{1}]'.format(self.character, self.kana)
 
     def __repr__(self):
-        return '<Vocabulary: {0}>'.format(self.raw['character'].encode('utf8'))
+        return '<Vocabulary: {0}>'.format(self.character.encode('utf8'))
+
+
+class ReviewSchedule(object):
+    '''
+    Items grouped by the datetime they are next available for review
+
+    Timestamps are kept in a sorted list so iteration is always in time order
+    and range lookups are a bisect. A count of items per type is updated as
+    items are added so totals never need a full scan.
+
+    Supports the dict operations used with the defaultdict query() used to
+    return, except that missing keys raise KeyError.
+    '''
+
+    def __init__(self, items=()):
+        self._times = []
+        self._items = {}
+        self.counts = collections.Counter()
+        for ts, obj in items:
+            self.add(ts, obj)
+
+    def add(self, ts, obj):
+        if ts not in self._items:
+            bisect.insort(self._times, ts)
+            self._items[ts] = []
+        self._items[ts].append(obj)
+        self.counts[obj.__class__] += 1
+
+    def __getitem__(self, ts):
+        return self._items[ts]
+
+    def __setitem__(self, ts, objs):
+        self.pop(ts, None)
+        for obj in objs:
+            self.add(ts, obj)
+
+    def __contains__(self, ts):
+        return ts in self._items
+
+    def __iter__(self):
+        return iter(list(self._times))
+
+    def __len__(self):
+        return len(self._times)
+
+    def __bool__(self):
+        return bool(self._times)
+    __nonzero__ = __bool__
+
+    def get(self, ts, default=None):
+        return self._items.get(ts, default)
+
+    def pop(self, ts, *default):
+        if ts not in self._items:
+            if default:
+                return default[0]
+            raise KeyError(ts)
+        del self._times[bisect.bisect_left(self._times, ts)]
+        objs = self._items.pop(ts)
+        for obj in objs:
+            self.counts[obj.__class__] -= 1
+        return objs
+
+    def keys(self):
+        return list(self._times)
+
+    def values(self):
+        return [self._items[ts] for ts in self._times]
+
+    def items(self):
+        return [(ts, self._items[ts]) for ts in self._times]
+
+    def total(self):
+        return sum(self.counts.values())
+
+    def between(self, start=None, end=None):
+        '''
+        Return (datetime, items) pairs with start <= datetime < end
+        '''
+        lo = 0 if start is None else bisect.bisect_left(self._times, start)
+        hi = len(self._times) if end is None else bisect.bisect_left(self._times, end)
+        return [(ts, self._items[ts]) for ts in self._times[lo:hi]]
+
+    def due_before(self, ts):
+        '''
+        Return every item available before ts
+        '''
+        return [obj for _, objs in self.between(end=ts) for obj in objs]
+
+    def filter(self, predicate):
+        '''
+        Return a new schedule with only the items matching predicate
+        '''
+        return ReviewSchedule(
+            (ts, obj) for ts in self._times for obj in self._items[ts] if predicate(obj)
+        )
+
+    def rollup(self, key):
+        '''
+        Return a new schedule with timestamps merged by key, for example
+        ``lambda ts: ts.date()`` for a daily schedule
+        '''
+        return ReviewSchedule(
+            (key(ts), obj) for ts in self._times for obj in self._items[ts]
+        )
+
+    def by_hour(self):
+        return self.rollup(lambda ts: ts.replace(minute=0, second=0, microsecond=0))
+
+    def by_day(self):
+        return self.rollup(lambda ts: ts.replace(hour=0, minute=0, second=0, microsecond=0))
+
+    def rollup_before(self, now):
+        '''
+        Return a new schedule where everything available before now is
+        merged into a single entry at now
+        '''
+        return self.rollup(lambda ts: now if ts < now else ts)
 
 
 class WaniKani(object):
-    def __init__(self, api_key):
+    #: :class:`RateLimiter` shared by every client, or None to send requests
+    #: unthrottled. See :func:`default_rate_limiter`.
+    rate_limiter = rate_limiter
+    #: Number of times a failed request is tried again
+    retries = 3
+    #: Base delay in seconds for the exponential backoff between retries
+    backoff = 0.5
+    #: Request timeouts per endpoint
+    timeouts = ENDPOINT_TIMEOUT
+    #: :class:`wanikani.metrics.Metrics` to record into, or None to skip
+    #: instrumentation entirely
+    metrics = None
+
+    def __init__(self, api_key, max_workers=4, memoize=False, compact=False, streaming=False, session=None):
+        '''
+        :param max_workers: Maximum number of requests to have in flight at
+            once when a call is split into multiple chunks
+        :param memoize: Remember each response for the lifetime of the
+            client so a url is only requested once, instead of only inside
+            :meth:`memoized` blocks. Long lived clients should call
+            :meth:`invalidate` to pick up new data.
+        :param compact: Do not keep the response dict on radicals, kanji and
+            vocabulary. Responses are still held while a memo is active.
+        :param streaming: Parse radical, kanji and vocabulary responses while
+            they download so items are available immediately and the full
+            response is never held in memory. Requires ijson, and bypasses
+            memoization and any caching done in :meth:`fetch`.
+        :param session: requests session to use. Defaults to the process wide
+            session from :func:`get_session` so connections are reused
+            between clients.
+        '''
         self.api_key = api_key
-        self.session = requests.Session()
+        self.max_workers = max_workers
+        self.memoize = memoize
+        self.keep_raw = not compact
+        if streaming and ijson is None:
+            logger.warning('ijson is not installed. Falling back to non streaming requests')
+            streaming = False
+        self.streaming = streaming
+        self.session = session or get_session()
+        self._memo = {}
+        self._memo_depth = 0
+        self._memo_lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def memoized(self):
+        '''
+        Request each url at most once inside the block
+
+        Blocks can be nested and used from several threads. Responses are
+        forgotten once the outermost block exits, unless the client was
+        created with memoize=True::
+
+            with client.memoized():
+                level = client.profile()['level']
+                queue = client.upcoming(level)
+        '''
+        with self._memo_lock:
+            self._memo_depth += 1
+        try:
+            yield self
+        finally:
+            with self._memo_lock:
+                self._memo_depth -= 1
+                if not self._memo_depth and not self.memoize:
+                    self._memo.clear()
+
+    def get(self, url, *args, **kwargs):
+        if not self.memoize and not self._memo_depth:
+            return self.fetch(url, *args, **kwargs)
+
+        # The first caller for a url does the fetch and everyone else (for
+        # example other chunks running in the thread pool) waits on its result
+        with self._memo_lock:
+            future = self._memo.get(url)
+            owner = future is None
+            if owner:
+                future = self._memo[url] = concurrent.futures.Future()
+
+        if owner:
+            try:
+                future.set_result(self.fetch(url, *args, **kwargs))
+            except Exception as e:
+                # Do not remember failures so that the next call can retry
+                with self._memo_lock:
+                    self._memo.pop(url, None)
+                future.set_exception(e)
+        else:
+            logger.debug('Reusing response for %s', parse_endpoint(url))
+            if self.metrics is not None:
+                self.metrics.inc('wanikani_memo_hits_total', endpoint=parse_endpoint(url))
+        return future.result()
+
+    def request(self, url, *args, **kwargs):
+        '''
+        Send a GET request through the rate limiter
 
-    def get(self, *args, **kwargs):
-        result = self.session.get(*args, **kwargs)
+        Connection errors, timeouts, 429 and 5xx responses are retried with
+        jittered exponential backoff, honoring Retry-After when the server
+        sends it. The last response is returned even if it is an error.
+        '''
+        endpoint = parse_endpoint(url)
+        kwargs.setdefault('timeout', self.timeouts.get(endpoint, DEFAULT_TIMEOUT))
+        for attempt in range(self.retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+
+            delay = random.uniform(0, self.backoff * 2 ** attempt)
+            metrics = self.metrics
+            if metrics is not None:
+                start = time.time()
+            try:
+                result = self.session.get(url, *args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if metrics is not None:
+                    metrics.inc('wanikani_request_errors_total', endpoint=endpoint)
+                if attempt == self.retries:
+                    raise
+                logger.warning('Error requesting %s: %s', endpoint, e)
+            else:
+                if metrics is not None:
+                    self._record(metrics, endpoint, result, time.time() - start, kwargs.get('stream'))
+                if result.status_code not in RETRY_STATUS or attempt == self.retries:
+                    return result
+                logger.warning('Error requesting %s: %s', endpoint, result.status_code)
+                wait = retry_after(result)
+                if wait is not None:
+                    delay = wait
+                    if self.rate_limiter is not None:
+                        self.rate_limiter.pause(wait)
+                result.close()
+
+            logger.debug('Retrying %s in %.2f seconds', endpoint, delay)
+            if metrics is not None:
+                metrics.inc('wanikani_retries_total', endpoint=endpoint)
+            time.sleep(delay)
+
+    @staticmethod
+    def _record(metrics, endpoint, result, duration, streamed):
+        metrics.inc('wanikani_requests_total', endpoint=endpoint, status=result.status_code)
+        # elapsed covers connecting and waiting for the server up to the
+        # headers. Unless the response is streamed, duration also includes
+        # downloading the body.
+        metrics.observe('wanikani_response_wait_seconds', result.elapsed.total_seconds(), endpoint=endpoint)
+        metrics.observe('wanikani_request_seconds', duration, endpoint=endpoint)
+        size = result.headers.get('Content-Length')
+        if size is None and not streamed:
+            size = len(result.content)
+        if size is not None:
+            metrics.inc('wanikani_response_bytes_total', int(size), endpoint=endpoint)
+
+    def fetch(self, url, *args, **kwargs):
+        result = self.request(url, *args, **kwargs)
+        result.raise_for_status()
+        if self.metrics is None:
+            return result.json()
+        start = time.time()
+        data = result.json()
+        self.metrics.observe('wanikani_decode_seconds', time.time() - start, endpoint=parse_endpoint(url))
+        return data
+
+    def stream(self, url, *args, **kwargs):
+        '''
+        Yield each entry of requested_information as it is parsed from the
+        response body
+        '''
+        result = self.request(url, *args, stream=True, **kwargs)
         result.raise_for_status()
-        return result.json
+        result.raw.decode_content = True
+
+        # Vocabulary responses put the list under a 'general' key
+        prefixes = ('requested_information.item', 'requested_information.general.item')
+        builder = None
+        try:
+            for prefix, event, value in ijson.parse(result.raw):
+                if builder is None:
+                    if event == 'start_map' and prefix in prefixes:
+                        builder = ijson.ObjectBuilder()
+                        builder.event(event, value)
+                    continue
+                if event == 'end_map' and prefix in prefixes:
+                    yield builder.value
+                    builder = None
+                else:
+                    builder.event(event, value)
+        finally:
+            result.close()
+
+    def get_list(self, url):
+        '''
+        Return the list of items from the requested_information of a response
+        '''
+        if self.streaming:
+            items = self.stream(url)
+        else:
+            data = self.get(url)
+            items = data['requested_information']
+            if 'general' in items:
+                items = items['general']
+        if self.metrics is not None:
+            items = self._count_items(items, parse_endpoint(url))
+        return items
+
+    def _count_items(self, items, endpoint):
+        count = 0
+        for item in items:
+            count += 1
+            yield item
+        self.metrics.inc('wanikani_items_total', count, endpoint=endpoint)
+
+    def invalidate(self, url=None):
+        '''
+        Forget memoized responses
+
+        :param url: Only forget the response for this url
+        '''
+        with self._memo_lock:
+            if url is None:
+                self._memo.clear()
+            else:
+                self._memo.pop(url, None)
+
+    @classmethod
+    def batch(cls, api_keys, operation, max_workers=8, **kwargs):
+        '''
+        Run the same operation for many API keys concurrently
+
+        Clients share the process wide session so connections are reused
+        between users. Only a few keys more than max_workers are queued at a
+        time, so api_keys may be a long iterator.
+
+        :param api_keys: Iterable of API keys
+        :param operation: Name of a client method such as 'upcoming', or a
+            callable taking the client
+        :param max_workers: Number of users processed at once
+        :param kwargs: Passed on to each client
+        :return: Generator of (api_key, result) pairs in the order they
+            finish. If the operation failed for a key the result is the
+            exception, and the other keys carry on.
+        '''
+        def run(api_key):
+            client = cls(api_key, **kwargs)
+            if callable(operation):
+                result = operation(client)
+            else:
+                result = getattr(client, operation)()
+            # Generators have to be consumed here, inside the worker
+            if hasattr(result, '__next__') or hasattr(result, 'next'):
+                result = list(result)
+            return result
+
+        api_keys = iter(api_keys)
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            pending = dict(
+                (executor.submit(run, api_key), api_key)
+                for api_key in itertools.islice(api_keys, max_workers * 2)
+            )
+            while pending:
+                done, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    api_key = pending.pop(future)
+                    for next_key in itertools.islice(api_keys, 1):
+                        pending[executor.submit(run, next_key)] = next_key
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.warning('Error running batch operation: %s', e)
+                        result = e
+                    yield api_key, result
 
     def profile(self):
         url = WANIKANI_BASE.format(self.api_key, 'user-information')
@@ -176,10 +801,8 @@ class WaniKani(object):
         url = WANIKANI_BASE.format(self.api_key, 'radicals')
         if levels:
             url += '/{0}'.format(levels)
-        data = self.get(url)
-
-        for item in data['requested_information']:
-            yield Radical(item)
+        for item in self.get_list(url):
+            yield Radical(item, self.keep_raw)
 
     def kanji(self, levels=None):
         """
@@ -193,10 +816,8 @@ class WaniKani(object):
         url = WANIKANI_BASE.format(self.api_key, 'kanji')
         if levels:
             url += '/{0}'.format(levels)
-        data = self.get(url)
-
-        for item in data['requested_information']:
-            yield Kanji(item)
+        for item in self.get_list(url):
+            yield Kanji(item, self.keep_raw)
 
     @split
     def vocabulary(self, levels=None):
@@ -212,14 +833,8 @@ class WaniKani(object):
         url = WANIKANI_BASE.format(self.api_key, 'vocabulary')
         if levels:
             url += '/{0}'.format(levels)
-        data = self.get(url)
-
-        if 'general' in data['requested_information']:
-            for item in data['requested_information']['general']:
-                yield Vocabulary(item)
-        else:
-            for item in data['requested_information']:
-                yield Vocabulary(item)
+        for item in self.get_list(url):
+            yield Vocabulary(item, self.keep_raw)
 
     def upcoming(self, levels=None):
         """
@@ -236,20 +851,48 @@ class WaniKani(object):
     def burning(self):
         return self.query(include=[u'enlighten'])
 
-    def query(self, levels=None, items=[Radical, Kanji, Vocabulary], exclude=[], include=[]):
+    def iter_items(self, levels=None, items=[Radical, Kanji, Vocabulary], exclude=[], include=[]):
         mapping = {
             Radical: self.radicals,
             Kanji: self.kanji,
             Vocabulary: self.vocabulary
         }
 
-        queue = collections.defaultdict(list)
-        for klass in items:
-            for obj in mapping[klass](levels):
-                if exclude and obj.srs in exclude:
-                    continue
-                if include and obj.srs not in include:
-                    continue
-                if obj.next_review:
-                    queue[obj.next_review].append(obj)
+        # Each item type is a separate endpoint so we can request them all at
+        # once and hand them back in whatever order they finish
+        with concurrent.futures.ThreadPoolExecutor(len(items) or 1) as executor:
+            futures = [executor.submit(list, mapping[klass](levels)) for klass in items]
+            for future in concurrent.futures.as_completed(futures):
+                for obj in future.result():
+                    if exclude and obj.srs in exclude:
+                        continue
+                    if include and obj.srs not in include:
+                        continue
+                    yield obj
+
+    def table(self, levels=None, items=[Radical, Kanji, Vocabulary], exclude=[], include=[]):
+        '''
+        Load items into a column oriented :class:`wanikani.table.ItemTable`
+
+        Takes the same filters as :meth:`query`
+        '''
+        from wanikani.table import ItemTable
+        return ItemTable.from_items(self.iter_items(levels, items, exclude, include))
+
+    def forecast(self, **kwargs):
+        '''
+        Project how many reviews are coming up each day by simulating the
+        SRS schedule of every item being reviewed
+
+        Takes the same options as :func:`wanikani.forecast.forecast_many`
+        and returns a :class:`wanikani.forecast.ReviewForecast`
+        '''
+        from wanikani.forecast import forecast
+        return forecast(self.iter_items(exclude=[u'burned']), **kwargs)
+
+    def query(self, levels=None, items=[Radical, Kanji, Vocabulary], exclude=[], include=[]):
+        queue = ReviewSchedule()
+        for obj in self.iter_items(levels, items, exclude, include):
+            if obj.next_review:
+                queue.add(obj.next_review, obj)
         return queue
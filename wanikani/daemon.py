@@ -0,0 +1,232 @@
+'''
+Keep a warm client in a long running process for the wk command line
+
+Status bars run ``wk upcoming`` every minute. With ``wk daemon`` running,
+those commands are sent over a Unix socket and answered from responses the
+daemon already has in memory instead of downloading every item again.
+
+Only the standard library is imported here so that checking for a running
+daemon does not slow down ``wk`` itself.
+'''
+import errno
+import json
+import logging
+import os
+import socket
+import stat
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+try:
+    # Python 2 commands print both str and unicode, which io.StringIO rejects
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+logger = logging.getLogger(__name__)
+
+# Commands send the API key to the daemon and print whatever it answers, so
+# the socket lives in a directory only this user can write to
+SOCKET_DIR = os.path.join(
+    os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir(),
+    'wanikani-{0}'.format(os.getuid()),
+)
+# Set WANIKANI_SOCKET to run more than one daemon or to move the socket
+SOCKET_PATH = os.environ.get('WANIKANI_SOCKET') or os.path.join(SOCKET_DIR, 'daemon.sock')
+
+# Seconds between background refreshes of the daemon's client
+DEFAULT_INTERVAL = 300
+# Seconds a forwarded command may take before giving up on the daemon
+FORWARD_TIMEOUT = 60
+
+
+def private(st):
+    '''
+    Check that a file belongs to this user and nobody else can write to it
+    '''
+    return st.st_uid == os.getuid() and not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def trusted(path):
+    '''
+    Check that a socket was created by this user, in a directory where
+    nobody else can replace it
+    '''
+    try:
+        st = os.lstat(path)
+        parent = os.stat(os.path.dirname(path) or '.')
+    except OSError:
+        return False
+    # Anyone can add files to a sticky directory like /tmp, but only the
+    # owner can remove or rename them
+    if not stat.S_ISSOCK(st.st_mode) or not private(st) or not (
+            private(parent) or parent.st_mode & stat.S_ISVTX):
+        logger.warning('Ignoring %s as it may belong to another user', path)
+        return False
+    return True
+
+
+def private_directory(path):
+    '''
+    Create a directory only this user can use, or check an existing one
+    '''
+    try:
+        os.makedirs(path, 0o700)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or not private(st):
+        raise RuntimeError('{0} must be a directory that only belongs to this user'.format(path))
+
+
+def forward(api_key, argv, path=SOCKET_PATH):
+    '''
+    Run a command line in the daemon
+
+    :return: Dict with status, stdout and stderr, or None if there is no
+        daemon for this API key and the command should be run locally
+    '''
+    if not trusted(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(FORWARD_TIMEOUT)
+    try:
+        sock.connect(path)
+        sock.sendall(json.dumps({'api_key': api_key, 'argv': argv}).encode('utf8'))
+        sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    except (IOError, OSError, socket.timeout) as e:
+        logger.debug('Daemon not available: %s', e)
+        return None
+    finally:
+        sock.close()
+
+    try:
+        response = json.loads(b''.join(chunks).decode('utf8'))
+    except ValueError:
+        return None
+    if response.get('status') is None:
+        return None
+    return response
+
+
+def listening(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except (IOError, OSError):
+        return False
+    finally:
+        sock.close()
+    return True
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.read().decode('utf8'))
+        except ValueError:
+            return
+        response = self.server.run(request)
+        self.wfile.write(json.dumps(response).encode('utf8'))
+
+
+class Daemon(socketserver.UnixStreamServer):
+    '''
+    Answer forwarded command lines from a client that is kept warm
+
+    :param make_client: Called to build a new client for each refresh
+    :param parser: The wk argument parser, used to parse forwarded commands
+    '''
+
+    def __init__(self, api_key, make_client, parser, path=SOCKET_PATH, interval=DEFAULT_INTERVAL):
+        self.api_key = api_key
+        self.make_client = make_client
+        self.parser = parser
+        self.path = path
+        self.interval = interval
+        self.client = None
+        # Commands write to sys.stdout, so they are run one at a time
+        self.lock = threading.Lock()
+
+        if os.path.dirname(path) == SOCKET_DIR:
+            private_directory(SOCKET_DIR)
+        if os.path.exists(path):
+            if listening(path):
+                raise RuntimeError('A daemon is already listening on {0}'.format(path))
+            # Left behind by a daemon that did not shut down cleanly
+            os.remove(path)
+        socketserver.UnixStreamServer.__init__(self, path, Handler)
+        os.chmod(path, 0o600)
+
+    def refresh(self):
+        '''
+        Build a new client and load the upcoming reviews before swapping it
+        in, so commands never wait on a cold client after the first refresh
+        '''
+        start = time.time()
+        client = self.make_client()
+        client.profile()
+        client.upcoming()
+        self.client = client
+        logger.info('Refreshed in %.2f seconds', time.time() - start)
+
+    def refresh_loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception('Error refreshing')
+
+    def run(self, request):
+        if request.get('api_key') != self.api_key:
+            # Someone else's key, so let the command run in their process
+            return {'status': None}
+
+        stdout, stderr = StringIO(), StringIO()
+        with self.lock:
+            saved = sys.stdout, sys.stderr
+            sys.stdout, sys.stderr = stdout, stderr
+            try:
+                status = 0
+                args = self.parser.parse_args(request['argv'])
+                args.func(self.client, args)
+            except SystemExit as e:
+                status = e.code if isinstance(e.code, int) else 1
+            except Exception:
+                traceback.print_exc()
+                status = 1
+            finally:
+                sys.stdout, sys.stderr = saved
+        return {
+            'status': status,
+            'stdout': stdout.getvalue(),
+            'stderr': stderr.getvalue(),
+        }
+
+    def serve(self):
+        self.refresh()
+        thread = threading.Thread(target=self.refresh_loop)
+        thread.daemon = True
+        thread.start()
+        logger.info('Listening on %s', self.path)
+        try:
+            self.serve_forever()
+        finally:
+            self.server_close()
+            os.remove(self.path)
@@ -3,11 +3,10 @@
 from __future__ import absolute_import
 
 from django.conf.urls import patterns, url
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.views.generic.base import View
 
-from icalendar import Calendar, Event
-
+from wanikani import ics
 from wanikani.core import WaniKani, Radical, Kanji
 
 
@@ -18,10 +17,15 @@ class WaniKaniView(View):
         level = client.profile()['level']
         queue = client.query(level, items=[Radical, Kanji], include=[u'apprentice'])
 
-        cal = Calendar()
-        cal.add('prodid', '-//Wanikani Blockers//github.com/kfdm/wanikani//')
-        cal.add('version', '2.0')
+        return StreamingHttpResponse(
+            ics.calendar(
+                '-//Wanikani Blockers//github.com/kfdm/wanikani//',
+                self.events(queue),
+            ),
+            content_type='text/plain; charset=utf-8'
+        )
 
+    def events(self, queue):
         for ts in sorted(queue):
             if not len(queue[ts]):
                 continue
@@ -34,29 +38,24 @@ class WaniKaniView(View):
             for obj in queue[ts]:
                 counts[obj.__class__] += 1
 
-            event = Event()
             if counts[Radical] and counts[Kanji]:
-                event.add('summary', u'部首: {0} 漢字: {1}'.format(
+                summary = u'部首: {0} 漢字: {1}'.format(
                     counts[Radical], counts[Kanji]
-                ))
+                )
             elif counts[Radical]:
-                event.add('summary', u'部首: {0}'.format(
+                summary = u'部首: {0}'.format(
                     counts[Radical]
-                ))
+                )
             else:
-                event.add('summary', u'漢字: {0}'.format(
+                summary = u'漢字: {0}'.format(
                     counts[Kanji]
-                ))
-            event.add('dtstart', ts)
-            event.add('dtend', ts)
-            event['uid'] = str(ts)
-
-            cal.add_component(event)
-
-        return HttpResponse(
-            content=cal.to_ical(),
-            content_type='text/plain; charset=utf-8'
-        )
+                )
+            yield [
+                ('SUMMARY', summary),
+                ('DTSTART', ts),
+                ('DTEND', ts),
+                ('UID', str(ts)),
+            ]
 
 urlpatterns = patterns(
     '',
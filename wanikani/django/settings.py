@@ -98,6 +98,26 @@ CACHES = {'default': django_cache_url.config(
 )}
 
 
+# Optional SQLite file used to keep a local copy of each user's items so that
+# only levels that may have changed are requested again
+WANIKANI_SYNC_PATH = os.environ.get('WANIKANI_SYNC_PATH')
+# Seconds a user's synced items are served before checking for changes
+WANIKANI_SYNC_MAX_AGE = int(os.environ.get('WANIKANI_SYNC_MAX_AGE', 300))
+
+# Connections kept open to the WaniKani API, shared by every request handled
+# by this process
+WANIKANI_POOL_SIZE = int(os.environ.get('WANIKANI_POOL_SIZE', 32))
+
+# Requests per second sent to WaniKani by this process, across every user.
+# Unset means no limit, with 429 responses still retried.
+WANIKANI_RATE_LIMIT = float(os.environ.get('WANIKANI_RATE_LIMIT') or 0)
+WANIKANI_RATE_BURST = int(os.environ.get('WANIKANI_RATE_BURST') or 0)
+
+# Record request, cache and item metrics and serve them at /metrics for
+# Prometheus. Each process keeps its own counts.
+WANIKANI_METRICS = os.environ.get('WANIKANI_METRICS', '').lower() in ('1', 'true', 'yes')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/1.9/ref/settings/#auth-password-validators
 
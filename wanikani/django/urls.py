@@ -15,7 +15,8 @@ Including another URLconf
     3. Add a URL to urlpatterns:  url(r'^blog/', include(blog_urls))
 """
 from wanikani.django.wk.views import (BlockersCalendar, DashboardView,
-                                      MainMenu, ReviewsCalendar)
+                                      ForecastCalendar, MainMenu,
+                                      ReviewsCalendar, metrics)
 
 from django.conf.urls import url
 from django.contrib import admin
@@ -27,6 +28,8 @@ urlpatterns = [
     url(r'^dashboard/', DashboardView.as_view(), name='dashboard'),
     url(r'^calendars/(?P<api_key>\w+)/blocker.ics', BlockersCalendar.as_view(), name='blockers'),
     url(r'^calendars/(?P<api_key>\w+)/reviews.ics', ReviewsCalendar.as_view(), name='reviews'),
+    url(r'^calendars/(?P<api_key>\w+)/forecast.ics', ForecastCalendar.as_view(), name='forecast'),
+    url(r'^metrics$', metrics, name='metrics'),
     url(r'^admin/', admin.site.urls),
 ]
 
@@ -38,6 +41,7 @@ def navigation(request):
                 (_('dashboard'), reverse('dashboard')),
                 (_('blockers calendar'), reverse('blockers', kwargs={'api_key': request.session.get('api_key')})),
                 (_('reviews calendar'), reverse('reviews', kwargs={'api_key': request.session.get('api_key')})),
+                (_('forecast calendar'), reverse('forecast', kwargs={'api_key': request.session.get('api_key')})),
             ]
         }
     return {}
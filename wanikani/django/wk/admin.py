@@ -1,5 +1,7 @@
-from wanikani.django.wk.models import ApiKey
+from wanikani.django.wk.models import ApiKey, Item, ReviewState
 
 from django.contrib import admin
 
 admin.site.register(ApiKey)
+admin.site.register(Item)
+admin.site.register(ReviewState)
@@ -1,7 +1,20 @@
 from django.apps import AppConfig
+from django.conf import settings
 from django.utils.translation import ugettext_lazy as _
 
 
 class WkConfig(AppConfig):
     name = 'wanikani.django.wk'
     verbose_name = _('wanikani')
+
+    def ready(self):
+        from wanikani.core import RateLimiter, WaniKani, configure_session
+        configure_session(pool_size=getattr(settings, 'WANIKANI_POOL_SIZE', 32))
+        if getattr(settings, 'WANIKANI_RATE_LIMIT', None):
+            WaniKani.rate_limiter = RateLimiter(
+                settings.WANIKANI_RATE_LIMIT,
+                getattr(settings, 'WANIKANI_RATE_BURST', None),
+            )
+        if getattr(settings, 'WANIKANI_METRICS', False):
+            from wanikani.metrics import Metrics
+            WaniKani.metrics = Metrics()
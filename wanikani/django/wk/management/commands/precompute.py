@@ -0,0 +1,70 @@
+import logging
+import time
+
+from wanikani.django.wk.models import ApiKey
+from wanikani.django.wk.store import store_items
+from wanikani.django.wk.views import (BlockersCalendar, ForecastCalendar,
+                                      ReviewsCalendar, client_options,
+                                      get_dashboard_context, user_key)
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+logger = logging.getLogger(__name__)
+
+CALENDARS = [BlockersCalendar, ReviewsCalendar, ForecastCalendar]
+
+
+def precompute(client, fresh_for):
+    '''
+    Store the dashboard and calendars for one user where the views look
+    for them first
+    '''
+    with client.memoized():
+        for apikey in ApiKey.objects.filter(key=client.api_key).select_related('user'):
+            store_items(apikey.user, client)
+        cache.set(user_key('dashboard', client.api_key), get_dashboard_context(client), fresh_for)
+        for view in CALENDARS:
+            view().build(client, fresh_for=fresh_for)
+
+
+class Command(BaseCommand):
+    help = 'Precompute dashboards and calendars for every registered API key'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep running, refreshing every interval',
+        )
+        parser.add_argument(
+            '--interval', type=int, default=300,
+            help='Seconds between refreshes',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Number of users processed at once',
+        )
+
+    def handle(self, **options):
+        # Results stay valid for two intervals so a slow run does not leave
+        # the views without anything to serve
+        fresh_for = options['interval'] * 2
+        klass, client_kwargs = client_options()
+
+        while True:
+            start = time.time()
+            keys = ApiKey.objects.values_list('key', flat=True)
+            count = 0
+            for api_key, result in klass.batch(
+                    keys,
+                    lambda client: precompute(client, fresh_for),
+                    max_workers=options['workers'],
+                    **client_kwargs):
+                if isinstance(result, Exception):
+                    self.stderr.write('Error precomputing user: {0}'.format(result))
+                count += 1
+            logger.info('Precomputed %d users in %.2f seconds', count, time.time() - start)
+
+            if not options['loop']:
+                break
+            time.sleep(max(0, options['interval'] - (time.time() - start)))
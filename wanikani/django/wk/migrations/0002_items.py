@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('wk', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apikey',
+            name='synced',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='synced'),
+        ),
+        migrations.CreateModel(
+            name='Item',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('radical', 'radical'), ('kanji', 'kanji'), ('vocabulary', 'vocabulary')], max_length=16, verbose_name='type')),
+                ('level', models.PositiveSmallIntegerField(verbose_name='level')),
+                ('character', models.CharField(blank=True, max_length=64, verbose_name='character')),
+                ('meaning', models.CharField(max_length=255, verbose_name='meaning')),
+                ('kana', models.CharField(blank=True, max_length=255, verbose_name='kana')),
+            ],
+            options={
+                'verbose_name': 'item',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReviewState',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('radical', 'radical'), ('kanji', 'kanji'), ('vocabulary', 'vocabulary')], max_length=16, verbose_name='type')),
+                ('level', models.PositiveSmallIntegerField(verbose_name='level')),
+                ('srs', models.CharField(blank=True, max_length=16, verbose_name='srs')),
+                ('srs_numeric', models.PositiveSmallIntegerField(default=0, verbose_name='srs numeric')),
+                ('available_date', models.DateTimeField(blank=True, null=True, verbose_name='available date')),
+                ('unlocked_date', models.DateTimeField(blank=True, null=True, verbose_name='unlocked date')),
+                ('burned_date', models.DateTimeField(blank=True, null=True, verbose_name='burned date')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='wk.Item', verbose_name='item')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'review state',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='item',
+            unique_together=set([('type', 'character', 'meaning')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='reviewstate',
+            unique_together=set([('user', 'item')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='reviewstate',
+            index_together=set([('user', 'type', 'level'), ('user', 'available_date')]),
+        ),
+    ]
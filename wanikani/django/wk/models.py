@@ -9,7 +9,65 @@ class ApiKey(models.Model):
         verbose_name=_('user')
     )
     key = models.CharField(max_length=32, verbose_name=_('apikey'))
+    synced = models.DateTimeField(null=True, blank=True, verbose_name=_('synced'))
 
     class Meta:
         verbose_name = _('apikey')
         unique_together = ('user', 'key')
+
+
+ITEM_TYPES = (
+    ('radical', _('radical')),
+    ('kanji', _('kanji')),
+    ('vocabulary', _('vocabulary')),
+)
+
+
+class Item(models.Model):
+    type = models.CharField(max_length=16, choices=ITEM_TYPES, verbose_name=_('type'))
+    level = models.PositiveSmallIntegerField(verbose_name=_('level'))
+    character = models.CharField(max_length=64, blank=True, verbose_name=_('character'))
+    meaning = models.CharField(max_length=255, verbose_name=_('meaning'))
+    kana = models.CharField(max_length=255, blank=True, verbose_name=_('kana'))
+
+    class Meta:
+        verbose_name = _('item')
+        unique_together = ('type', 'character', 'meaning')
+
+    def __str__(self):
+        if self.type == 'vocabulary':
+            return u'{0} [{1}]'.format(self.character, self.kana)
+        return self.character
+
+
+class ReviewState(models.Model):
+    '''
+    A user's progress on a single item
+
+    type and level are copied from the item so the common lookups can be
+    answered from an index without a join
+    '''
+    user = models.ForeignKey(
+        'auth.User',
+        on_delete=models.CASCADE,
+        verbose_name=_('user')
+    )
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, verbose_name=_('item'))
+    type = models.CharField(max_length=16, choices=ITEM_TYPES, verbose_name=_('type'))
+    level = models.PositiveSmallIntegerField(verbose_name=_('level'))
+    srs = models.CharField(max_length=16, blank=True, verbose_name=_('srs'))
+    srs_numeric = models.PositiveSmallIntegerField(default=0, verbose_name=_('srs numeric'))
+    available_date = models.DateTimeField(null=True, blank=True, verbose_name=_('available date'))
+    unlocked_date = models.DateTimeField(null=True, blank=True, verbose_name=_('unlocked date'))
+    burned_date = models.DateTimeField(null=True, blank=True, verbose_name=_('burned date'))
+
+    class Meta:
+        verbose_name = _('review state')
+        unique_together = ('user', 'item')
+        index_together = [
+            ('user', 'type', 'level'),
+            ('user', 'available_date'),
+        ]
+
+    def __str__(self):
+        return str(self.item)
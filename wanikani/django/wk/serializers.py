@@ -0,0 +1,97 @@
+import json
+import logging
+import zlib
+
+# msgpack gives a smaller and faster encoding than JSON if it is installed
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+# Fields read by wanikani.core.BaseObject and the templates. Everything else
+# in an item is dropped before caching.
+ITEM_FIELDS = ('type', 'character', 'kana', 'meaning', 'level', 'percentage')
+USER_SPECIFIC_FIELDS = (
+    'srs',
+    'srs_numeric',
+    'available_date',
+    'unlocked_date',
+    'burned',
+    'burned_date',
+)
+
+
+def trim_item(item):
+    trimmed = dict((key, item[key]) for key in ITEM_FIELDS if key in item)
+    user_specific = item.get('user_specific')
+    if user_specific is not None:
+        user_specific = dict(
+            (key, user_specific[key]) for key in USER_SPECIFIC_FIELDS if key in user_specific
+        )
+    trimmed['user_specific'] = user_specific
+    return trimmed
+
+
+def trim(data):
+    '''
+    Return a copy of a response with only the item fields we use
+    '''
+    info = data.get('requested_information')
+    if isinstance(info, dict) and 'general' in info:
+        info = dict(info, general=[trim_item(item) for item in info['general']])
+    elif isinstance(info, list):
+        info = [trim_item(item) for item in info]
+    else:
+        return data
+    return dict(data, requested_information=info)
+
+
+class PassthroughSerializer(object):
+    '''
+    Store the decoded response as is
+    '''
+
+    def dumps(self, data, raw_size=None):
+        return data
+
+    def loads(self, value):
+        return value
+
+
+class CompactSerializer(object):
+    '''
+    Trim, encode and compress responses before they go into the cache
+
+    Values are stored as bytes prefixed with the encoding used so entries
+    written with or without msgpack can both be read back.
+    '''
+
+    def __init__(self, trim=True, level=6):
+        self.trim = trim
+        self.level = level
+
+    def dumps(self, data, raw_size=None):
+        if self.trim:
+            data = trim(data)
+        if msgpack is not None:
+            prefix, encoded = b'm', msgpack.packb(data, use_bin_type=True)
+        else:
+            prefix, encoded = b'j', json.dumps(data, separators=(',', ':')).encode('utf8')
+        value = prefix + zlib.compress(encoded, self.level)
+        if raw_size:
+            logger.info(
+                'Cached %d bytes for a %d byte response (%.1f%%)',
+                len(value), raw_size, 100.0 * len(value) / raw_size
+            )
+        return value
+
+    def loads(self, value):
+        if not isinstance(value, bytes):
+            # Written by PassthroughSerializer
+            return value
+        encoded = zlib.decompress(value[1:])
+        if value[:1] == b'm':
+            return msgpack.unpackb(encoded, raw=False)
+        return json.loads(encoded.decode('utf8'))
@@ -0,0 +1,142 @@
+import calendar
+import datetime
+import logging
+
+from wanikani.core import Kanji, Radical, Vocabulary
+from wanikani.django.wk.models import ApiKey, Item, ReviewState
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TYPES = {
+    Radical: 'radical',
+    Kanji: 'kanji',
+    Vocabulary: 'vocabulary',
+}
+
+# Characters looked up per query when loading items
+LOOKUP_BATCH = 500
+
+
+def to_datetime(ts):
+    if not ts:
+        return None
+    if settings.USE_TZ:
+        return datetime.datetime.fromtimestamp(ts, timezone.utc)
+    return datetime.datetime.fromtimestamp(ts)
+
+
+def to_local(dt):
+    '''
+    Convert a stored datetime to a naive local one, matching the datetimes
+    wanikani.core gives for items fetched from the API
+    '''
+    if timezone.is_aware(dt):
+        return datetime.datetime.fromtimestamp(calendar.timegm(dt.utctimetuple()))
+    return dt
+
+
+def item_key(obj):
+    return (TYPES[obj.__class__], obj.character or '', obj.meaning or '')
+
+
+def load_items(keys):
+    '''
+    Return a mapping of item key to the stored Item for the keys that exist
+    '''
+    characters = {}
+    for type, character, meaning in keys:
+        characters.setdefault(type, set()).add(character)
+
+    items = {}
+    for type, values in characters.items():
+        values = sorted(values)
+        # Keep under the limit on query parameters some databases have
+        for i in range(0, len(values), LOOKUP_BATCH):
+            for item in Item.objects.filter(type=type, character__in=values[i:i + LOOKUP_BATCH]):
+                key = (item.type, item.character, item.meaning)
+                if key in keys:
+                    items[key] = item
+    return items
+
+
+def get_items(objs):
+    '''
+    Return a mapping of item key to Item, creating any that are missing and
+    updating any that WaniKani has since moved to another level
+    '''
+    objs = dict((item_key(obj), obj) for obj in objs)
+    keys = set(objs)
+
+    items = load_items(keys)
+    missing = [key for key in keys if key not in items]
+    if missing:
+        new = [Item(
+            type=key[0],
+            level=objs[key].level,
+            character=key[1],
+            meaning=key[2],
+            kana=getattr(objs[key], 'kana', None) or '',
+        ) for key in missing]
+        try:
+            with transaction.atomic():
+                Item.objects.bulk_create(new, batch_size=500)
+        except IntegrityError:
+            # Another worker stored some of the same items first
+            for item in new:
+                Item.objects.get_or_create(
+                    type=item.type, character=item.character, meaning=item.meaning,
+                    defaults={'level': item.level, 'kana': item.kana},
+                )
+        # bulk_create does not set primary keys on every backend
+        items = load_items(keys)
+
+    for key, item in items.items():
+        obj = objs[key]
+        kana = getattr(obj, 'kana', None) or ''
+        if item.level != obj.level or item.kana != kana:
+            item.level, item.kana = obj.level, kana
+            item.save(update_fields=['level', 'kana'])
+    return items
+
+
+def store_items(user, client):
+    '''
+    Replace the stored review state for a user with their current items
+    '''
+    objs = list(client.iter_items())
+    items = get_items(objs)
+
+    states = [ReviewState(
+        user=user,
+        item=items[item_key(obj)],
+        type=TYPES[obj.__class__],
+        level=obj.level,
+        srs=obj.srs or '',
+        srs_numeric=obj.srs_numeric,
+        available_date=to_datetime(obj['available_date']),
+        unlocked_date=to_datetime(obj.unlocked),
+        burned_date=to_datetime(obj.burned),
+    ) for obj in objs]
+
+    with transaction.atomic():
+        ReviewState.objects.filter(user=user).delete()
+        ReviewState.objects.bulk_create(states, batch_size=500)
+        ApiKey.objects.filter(user=user).update(synced=timezone.now())
+    logger.info('Stored %d items', len(states))
+
+
+def stored_user(api_key):
+    '''
+    Return the user for an API key if their items were stored recently
+    enough to be served from the database, otherwise None
+    '''
+    max_age = getattr(settings, 'WANIKANI_STORE_MAX_AGE', 3600)
+    apikey = ApiKey.objects.filter(
+        key=api_key,
+        synced__gte=timezone.now() - datetime.timedelta(seconds=max_age),
+    ).select_related('user').first()
+    return apikey.user if apikey else None
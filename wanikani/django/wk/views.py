@@ -3,18 +3,25 @@
 from __future__ import absolute_import
 
 import collections
+import hashlib
 import logging
 import math
 import operator
+import time
 
-from icalendar import Calendar, Event
-
-from wanikani.core import Kanji, Radical, WaniKani
+from wanikani import ics
+from wanikani.core import Kanji, Radical, WaniKani, parse_endpoint
+from wanikani.django.wk.models import ReviewState
+from wanikani.django.wk.serializers import CompactSerializer
+from wanikani.django.wk.store import stored_user, to_local
+from wanikani.sync import SyncedWaniKani, SyncStore
 
 from django import forms
+from django.conf import settings
 from django.core.cache import cache
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
 from django.shortcuts import render
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
 from django.views.generic.base import View
 
 logger = logging.getLogger(__name__)
@@ -23,22 +30,155 @@ class ApiForm(forms.Form):
     api_key = forms.CharField(max_length=32)
 
 
+# Soft and hard expiry (in seconds) for each endpoint. Once the soft expiry
+# passes, one request refreshes the entry while everyone else keeps getting
+# the stale copy. The hard expiry is how long the cache backend keeps it.
+CACHE_TIMEOUTS = {
+    'user-information': (300, 3600),
+    'level-progression': (300, 3600),
+    'recent-unlocks': (300, 3600),
+    'critical-items': (600, 3600),
+    'radicals': (900, 86400),
+    'kanji': (900, 86400),
+    'vocabulary': (1800, 86400),
+}
+DEFAULT_CACHE_TIMEOUT = (300, 3600)
+
+
 class CachedWaniKani(WaniKani):
-    def get(self, url, *args, **kwargs):
-        result = cache.get(url)
-        if result is not None:
-            logger.info('Found cache for %s', url)
-            return result
-        result = self.session.get(url, *args, **kwargs)
+    #: Converts responses to and from what is stored in the cache
+    serializer = CompactSerializer()
+    #: Seconds a refresh lock is held before another request may take over
+    lock_timeout = 30
+    #: Seconds to wait for another request to fill an empty cache entry
+    lock_wait = 10
+
+    def fetch(self, url, *args, **kwargs):
+        endpoint = parse_endpoint(url)
+        entry = cache.get(url)
+        # Entries are stored as (soft expiry, data)
+        if isinstance(entry, tuple):
+            expires, data = entry
+            data = self.serializer.loads(data)
+            if time.time() < expires:
+                logger.info('Found cache for %s', endpoint)
+                if self.metrics is not None:
+                    self.metrics.inc('wanikani_cache_total', endpoint=endpoint, result='hit')
+                return data
+
+            if self.metrics is not None:
+                self.metrics.inc('wanikani_cache_total', endpoint=endpoint, result='stale')
+
+            # Stale while revalidate. Whoever gets the lock refreshes the
+            # entry and everyone else is answered from the stale copy
+            if not cache.add('lock:' + url, 1, self.lock_timeout):
+                logger.info('Serving stale cache for %s', endpoint)
+                return data
+            try:
+                return self.refresh(url, *args, **kwargs)
+            except Exception:
+                logger.exception('Error refreshing %s, serving stale cache', endpoint)
+                return data
+            finally:
+                cache.delete('lock:' + url)
+
+        # Nothing cached, so only one request should go upstream while the
+        # others wait for it to fill the cache
+        locked = cache.add('lock:' + url, 1, self.lock_timeout)
+        deadline = time.time() + self.lock_wait
+        while not locked and time.time() < deadline:
+            time.sleep(0.1)
+            entry = cache.get(url)
+            if isinstance(entry, tuple):
+                logger.info('Found cache for %s after waiting', endpoint)
+                if self.metrics is not None:
+                    self.metrics.inc('wanikani_cache_total', endpoint=endpoint, result='wait')
+                return self.serializer.loads(entry[1])
+            locked = cache.add('lock:' + url, 1, self.lock_timeout)
+
+        if self.metrics is not None:
+            self.metrics.inc('wanikani_cache_total', endpoint=endpoint, result='miss')
+
+        try:
+            return self.refresh(url, *args, **kwargs)
+        finally:
+            if locked:
+                cache.delete('lock:' + url)
+
+    def refresh(self, url, *args, **kwargs):
+        soft, hard = CACHE_TIMEOUTS.get(parse_endpoint(url), DEFAULT_CACHE_TIMEOUT)
+        result = self.request(url, *args, **kwargs)
         result.raise_for_status()
         data = result.json()
-        logger.info('Caching for %s', url)
-        cache.set(url, data)
+        logger.info('Caching for %s', parse_endpoint(url))
+        cache.set(url, (time.time() + soft, self.serializer.dumps(data, len(result.content))), hard)
         return data
 
+
+class CachedSyncedWaniKani(SyncedWaniKani, CachedWaniKani):
+    '''
+    Keeps items in a :class:`wanikani.sync.SyncStore` and fetches everything
+    else, including the levels a sync downloads, through the Django cache
+    '''
+
+
+_sync_store = []
+
+
+def get_sync_store():
+    # One connection per process is shared between requests
+    if not _sync_store:
+        _sync_store.append(SyncStore(settings.WANIKANI_SYNC_PATH))
+    return _sync_store[0]
+
+
+def get_client(request, api_key):
+    '''
+    Return a client shared by everything handling this request
+
+    The context processor and the view usually ask for the same data, so
+    sharing one memoizing client means each url is only loaded once. The
+    client goes away with the request, and its memo with it.
+    '''
+    clients = request.__dict__.setdefault('wanikani_clients', {})
+    if api_key not in clients:
+        klass, options = client_options()
+        clients[api_key] = klass(api_key, memoize=True, **options)
+    return clients[api_key]
+
+
+def client_options():
+    '''
+    Return the client class and its keyword arguments for this site
+    '''
+    if getattr(settings, 'WANIKANI_SYNC_PATH', None):
+        return CachedSyncedWaniKani, {
+            'store': get_sync_store(),
+            'max_age': getattr(settings, 'WANIKANI_SYNC_MAX_AGE', 300),
+        }
+    return CachedWaniKani, {}
+
+
+def user_key(prefix, api_key):
+    # Keep API keys out of cache keys
+    return '{0}:{1}'.format(prefix, hashlib.sha1(api_key.encode('utf8')).hexdigest())
+
+
+def metrics(request):
+    '''
+    Expose client metrics for Prometheus when WANIKANI_METRICS is enabled
+    '''
+    if WaniKani.metrics is None:
+        raise Http404('Metrics are not enabled')
+    return HttpResponse(
+        WaniKani.metrics.prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
 def context_process(request):
     if request.session.get('api_key'):
-        client = CachedWaniKani(request.session.get('api_key'))
+        client = get_client(request, request.session.get('api_key'))
         return {
             'wk_client': client,
             'profile': client.profile(),
@@ -64,111 +204,246 @@ class MainMenu(View):
             return render(request, 'login.html', {'form': form})
 
 
-class DashboardView(View):
-    def get(self, request):
-        client = CachedWaniKani(request.session.get('api_key'))
-        profile = client.profile()
+def get_dashboard_context(client):
+    profile = client.profile()
 
+    user = stored_user(client.api_key)
+    if user is not None:
+        states = ReviewState.objects.filter(user=user, level=profile['level']).order_by('-srs_numeric')
+        radicals = list(states.filter(type='radical').select_related('item'))
+        kanji = list(states.filter(type='kanji').select_related('item'))
+    else:
         radicals = sorted(client.radicals(levels=profile['level']), key=operator.attrgetter('srs_numeric'), reverse=True)
         kanji = sorted(client.kanji(levels=profile['level']), key=operator.attrgetter('srs_numeric'), reverse=True)
 
-        levels = collections.defaultdict(list)
-        for item in radicals:
-            levels[item.srs_numeric].append(item)
-        for item in kanji:
-            levels[item.srs_numeric].append(item)
+    return {
+        'kanji': kanji,
+        'profile': profile,
+        'radicals': radicals,
+        'kanji_goal': math.ceil(len(kanji) * 0.9),
+        'radical_goal': math.ceil(len(radicals) * 0.9),
+    }
 
-        #sorted(durations.items(), key=operator.itemgetter(1), reverse=True)
 
-        return render(request, 'dashboard.html', {
-            #'current_level': levels,
-            'kanji': kanji,
-            'profile': profile,
-            'radicals': radicals,
-            'kanji_goal': math.ceil(len(kanji) * 0.9),
-            'radical_goal': math.ceil(len(radicals) * 0.9),
-        })
+class DashboardView(View):
+    def get(self, request):
+        api_key = request.session.get('api_key')
+        # Filled in by the precompute management command when it is running
+        context = cache.get(user_key('dashboard', api_key))
+        if context is None:
+            context = get_dashboard_context(get_client(request, api_key))
+        return render(request, 'dashboard.html', context)
 
 
-class BlockersCalendar(View):
+class CalendarView(View):
     '''
-    Calendar to graph all the blockers for the next level
+    Base for the .ics calendar feeds
+
+    Calendar clients poll these every few minutes. Subclasses only work out
+    the list of events, which is fingerprinted into an ETag. If the client
+    already has that version it gets a 304, and the rendered calendar is
+    cached so it is only rebuilt when the events change.
     '''
+    prodid = None
+    #: Seconds to keep a rendered calendar around
+    cache_timeout = 86400
+
+    def get_events(self, client):
+        '''
+        Return a list of (dtstart, summary) tuples in order
+        '''
+        raise NotImplementedError
+
+    def make_event(self, dtstart, summary):
+        '''
+        Return the (name, value) properties of one event
+        '''
+        return [
+            ('SUMMARY', summary),
+            ('DTSTART', dtstart),
+        ]
+
+    def render_calendar(self, events):
+        '''
+        Yield the calendar as chunks of bytes
+        '''
+        return ics.calendar(self.prodid, (
+            self.make_event(dtstart, summary) for dtstart, summary in events
+        ))
+
+    def build(self, client, fresh_for=0, stream=False):
+        '''
+        Return the (etag, last_modified, content) of the calendar, rendering
+        it only if the events changed
+
+        :param fresh_for: Seconds the view may serve the result without
+            checking the events again. Used by the precompute command.
+        :param stream: If the calendar has to be rendered, return content as
+            an iterator of chunks instead of bytes. The calendar is cached
+            once the iterator has been read to the end.
+        '''
+        events = self.get_events(client)
+        etag = hashlib.sha1(repr(events).encode('utf8')).hexdigest()
+
+        key = user_key('calendar:' + self.__class__.__name__, client.api_key)
+        cached = cache.get(key)
+        if cached is not None and cached[0] == etag:
+            last_modified, content = cached[1], cached[2]
+            cache.set(key, (etag, last_modified, content, time.time() + fresh_for), self.cache_timeout)
+            return etag, last_modified, content
+
+        logger.info('Rendering %s', self.__class__.__name__)
+        last_modified = int(time.time())
+
+        def render():
+            chunks = []
+            for chunk in self.render_calendar(events):
+                chunks.append(chunk)
+                yield chunk
+            cache.set(key, (etag, last_modified, b''.join(chunks), time.time() + fresh_for), self.cache_timeout)
+
+        if stream:
+            return etag, last_modified, render()
+        return etag, last_modified, b''.join(render())
+
     def get(self, request, **kwargs):
-        client = CachedWaniKani(kwargs['api_key'])
+        key = user_key('calendar:' + self.__class__.__name__, kwargs['api_key'])
+        cached = cache.get(key)
+        if cached is not None and time.time() < cached[3]:
+            etag, last_modified, content = cached[:3]
+        else:
+            etag, last_modified, content = self.build(get_client(request, kwargs['api_key']), stream=True)
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        if if_none_match is not None:
+            # Older Django returns the etags unquoted, newer versions quoted
+            etags = parse_etags(if_none_match)
+            not_modified = etag in etags or quote_etag(etag) in etags or '*' in etags
+        else:
+            not_modified = if_modified_since is not None and last_modified <= if_modified_since
+
+        if not_modified:
+            response = HttpResponseNotModified()
+        elif isinstance(content, bytes):
+            response = HttpResponse(
+                content=content,
+                content_type='text/calendar; charset=utf-8'
+            )
+        else:
+            # Freshly rendered, so send it as it is written
+            response = StreamingHttpResponse(
+                content,
+                content_type='text/calendar; charset=utf-8'
+            )
+        response['ETag'] = quote_etag(etag)
+        response['Last-Modified'] = http_date(last_modified)
+        return response
 
-        level = client.profile()['level']
-        queue = client.query(level, items=[Radical, Kanji], include=[u'apprentice'])
 
-        cal = Calendar()
-        cal.add('prodid', '-//Wanikani Blockers//github.com/kfdm/wanikani//')
-        cal.add('version', '2.0')
+class BlockersCalendar(CalendarView):
+    '''
+    Calendar to graph all the blockers for the next level
+    '''
+    prodid = '-//Wanikani Blockers//github.com/kfdm/wanikani//'
 
-        for ts in sorted(queue):
-            if not len(queue[ts]):
-                continue
+    def get_events(self, client):
+        level = client.profile()['level']
 
+        user = stored_user(client.api_key)
+        if user is not None:
+            rows = ReviewState.objects.filter(
+                user=user,
+                level=level,
+                type__in=['radical', 'kanji'],
+                srs=u'apprentice',
+                available_date__isnull=False,
+            ).order_by('available_date').values_list('available_date', 'type')
+            classes = {'radical': Radical, 'kanji': Kanji}
+            queue = collections.OrderedDict()
+            for available_date, type_ in rows:
+                ts = to_local(available_date)
+                queue.setdefault(ts, []).append(classes[type_])
+        else:
+            queue = collections.OrderedDict(
+                (ts, [obj.__class__ for obj in objs]) for ts, objs in
+                client.query(level, items=[Radical, Kanji], include=[u'apprentice']).items()
+            )
+
+        events = []
+        for ts, classes in queue.items():
             counts = {
                 Radical: 0,
                 Kanji: 0,
             }
 
-            for obj in queue[ts]:
-                counts[obj.__class__] += 1
+            for klass in classes:
+                counts[klass] += 1
 
-            event = Event()
             if counts[Radical] and counts[Kanji]:
-                event.add('summary', u'部首: {0} 漢字: {1}'.format(
+                summary = u'部首: {0} 漢字: {1}'.format(
                     counts[Radical], counts[Kanji]
-                ))
+                )
             elif counts[Radical]:
-                event.add('summary', u'部首: {0}'.format(
+                summary = u'部首: {0}'.format(
                     counts[Radical]
-                ))
+                )
             else:
-                event.add('summary', u'漢字: {0}'.format(
+                summary = u'漢字: {0}'.format(
                     counts[Kanji]
-                ))
-            event.add('dtstart', ts)
-            event.add('dtend', ts)
-            event['uid'] = str(ts)
-
-            cal.add_component(event)
+                )
+            events.append((ts, summary))
+        return events
 
-        return HttpResponse(
-            content=cal.to_ical(),
-            content_type='text/calendar; charset=utf-8'
-        )
+    def make_event(self, dtstart, summary):
+        event = super(BlockersCalendar, self).make_event(dtstart, summary)
+        event.append(('DTEND', dtstart))
+        event.append(('UID', str(dtstart)))
+        return event
 
 
-class ReviewsCalendar(View):
+class ReviewsCalendar(CalendarView):
     '''
     Show the number of reviews for that day
     '''
-    def get(self, request, **kwargs):
-        client = CachedWaniKani(kwargs['api_key'])
-        queue = client.upcoming()
+    prodid = '-//Wanikani Reviews//github.com/kfdm/django-wanikani//'
+
+    def get_events(self, client):
+        user = stored_user(client.api_key)
+        if user is not None:
+            rows = ReviewState.objects.filter(
+                user=user,
+                available_date__isnull=False,
+            ).exclude(srs=u'burned').values_list('available_date', flat=True)
+            days = collections.Counter(to_local(ts).date() for ts in rows)
+            totals = sorted(days.items())
+        else:
+            table = client.table(exclude=[u'burned'])
+            totals = [(ts, sum(counts.values())) for ts, counts in table.group_by_day().items()]
 
-        cal = Calendar()
-        cal.add('prodid', '-//Wanikani Reviews//github.com/kfdm/django-wanikani//')
-        cal.add('version', '2.0')
+        events = []
+        for ts, total in totals:
+            if not total:
+                continue
+            events.append((ts, u'復習 {0}'.format(total)))
+        return events
 
-        newqueue = collections.defaultdict(list)
-        for ts in list(queue.keys()):
-            newts = ts.date()
-            newqueue[newts] += queue.pop(ts)
-        queue = newqueue
 
-        for ts in sorted(queue):
-            if not len(queue[ts]):
-                continue
+class ForecastCalendar(CalendarView):
+    '''
+    Projected number of reviews for each day
+    '''
+    prodid = '-//Wanikani Forecast//github.com/kfdm/wanikani//'
+    #: Fixed so the events, and with them the ETag, only change when the
+    #: items or the current hour do
+    seed = 0
 
-            event = Event()
-            event.add('summary', '復習 {0}'.format(len(queue[ts])))
-            event.add('dtstart', ts)
-            cal.add_component(event)
+    def get_events(self, client):
+        result = client.forecast(seed=self.seed)
 
-        return HttpResponse(
-            content=cal.to_ical(),
-            content_type='text/calendar; charset=utf-8'
-        )
+        events = []
+        for day, mean in result.by_day().items():
+            if not round(mean):
+                continue
+            events.append((day, u'予測 {0}'.format(int(round(mean)))))
+        return events
@@ -0,0 +1,285 @@
+import collections
+import datetime
+import random
+
+from wanikani.table import _timestamp
+
+# If numpy is installed every trial of every item is simulated at once with
+# array operations. Otherwise we fall back to simulating them one at a time.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__all__ = ['ReviewForecast', 'forecast', 'forecast_many']
+
+HOUR = 3600
+
+# Seconds until the next review once an item reaches each srs_numeric stage
+INTERVALS = {
+    1: 4 * HOUR,
+    2: 8 * HOUR,
+    3: 23 * HOUR,
+    4: 47 * HOUR,
+    5: 167 * HOUR,
+    6: 335 * HOUR,
+    7: 719 * HOUR,
+    8: 2879 * HOUR,
+}
+BURNED = 9
+
+DEFAULT_ACCURACY = 0.85
+DEFAULT_TRIALS = 100
+DEFAULT_WEEKS = 4
+
+# Rough limit on the size of the arrays forecast_many works with at once
+MAX_BATCH = 4000000
+
+
+class ReviewForecast(object):
+    '''
+    Projected number of reviews per hour and per day
+
+    :ivar start: Local datetime of the start of the first hour
+    :ivar hourly: Mean number of reviews in each hour
+    :ivar days: Date of each day covered
+    :ivar daily: Reviews per day in each trial, one row per trial
+    '''
+
+    def __init__(self, start, hourly, days, daily):
+        self.start = start
+        self.hourly = hourly
+        self.days = days
+        self.daily = daily
+
+    def by_hour(self):
+        return collections.OrderedDict(
+            (self.start + datetime.timedelta(hours=i), float(mean))
+            for i, mean in enumerate(self.hourly)
+        )
+
+    def by_day(self):
+        '''
+        Return an ordered mapping of date to the mean number of reviews
+        '''
+        if numpy is not None:
+            means = numpy.asarray(self.daily).mean(axis=0)
+        else:
+            means = [float(sum(col)) / len(col) for col in zip(*self.daily)]
+        return collections.OrderedDict(
+            (day, float(mean)) for day, mean in zip(self.days, means)
+        )
+
+    def percentile(self, q):
+        '''
+        Return an ordered mapping of date to the number of reviews not
+        exceeded in q percent of trials
+        '''
+        if numpy is not None:
+            values = numpy.percentile(numpy.asarray(self.daily), q, axis=0)
+        else:
+            values = []
+            for col in zip(*self.daily):
+                col = sorted(col)
+                values.append(col[min(len(col) - 1, int(len(col) * q / 100.0))])
+        return collections.OrderedDict(
+            (day, float(value)) for day, value in zip(self.days, values)
+        )
+
+
+def forecast(items, **kwargs):
+    '''
+    Simulate future reviews for one user's items
+
+    See :func:`forecast_many` for the options.
+    '''
+    return forecast_many([items], **kwargs)[0]
+
+
+def forecast_many(inventories, weeks=DEFAULT_WEEKS, accuracy=DEFAULT_ACCURACY,
+                  trials=DEFAULT_TRIALS, now=None, seed=None, intervals=INTERVALS):
+    '''
+    Simulate future reviews for many users at once
+
+    Each review is assumed to be done as soon as it is available. A correct
+    answer moves the item up a stage and a wrong one moves it down one stage
+    (two from guru and above), then the next review is scheduled from the
+    new stage's interval. Items that have not been unlocked yet and lessons
+    still to come are not included.
+
+    :param inventories: One iterable of radicals, kanji and vocabulary per user
+    :param weeks: How far ahead to simulate
+    :param accuracy: Chance of answering a review correctly, either a number
+        or a mapping of srs_numeric stage to a number
+    :param trials: Number of simulations to run for each user
+    :param now: Local datetime to start from. Defaults to now.
+    :param seed: Seed for the random numbers, so results can be repeated
+    :return: A :class:`ReviewForecast` per inventory
+    '''
+    now = now or datetime.datetime.now()
+    start = now.replace(minute=0, second=0, microsecond=0)
+    start_ts = _timestamp(start)
+    hours = int(weeks * 7 * 24)
+
+    # The hour buckets each day starts at, in local time
+    days, day_starts = [], []
+    for i in range(hours):
+        day = (start + datetime.timedelta(hours=i)).date()
+        if not days or days[-1] != day:
+            days.append(day)
+            day_starts.append(i)
+
+    if isinstance(accuracy, dict):
+        accuracy = [accuracy.get(stage, DEFAULT_ACCURACY) for stage in range(BURNED + 1)]
+    else:
+        accuracy = [accuracy] * (BURNED + 1)
+    # Indexed by stage, with nothing more to wait for once burned
+    interval = [0] + [intervals[stage] for stage in range(1, BURNED)] + [0]
+
+    inventories = [_prepare(items, start_ts) for items in inventories]
+
+    if numpy is None:
+        rand = random.Random(seed)
+        results = []
+        for available, stages in inventories:
+            counts = _simulate_python(available, stages, hours, trials, accuracy, interval, rand)
+            results.append(_result(start, counts, days, day_starts))
+        return results
+
+    rng = numpy.random.RandomState(seed)
+    results = []
+    for batch in _batches(inventories, trials, hours):
+        counts = _simulate_numpy(batch, hours, trials, accuracy, interval, rng)
+        results.extend(_result(start, group, days, day_starts) for group in counts)
+    return results
+
+
+def _batches(inventories, trials, hours):
+    '''
+    Group users so the arrays for each simulation stay around MAX_BATCH
+    '''
+    batch, size = [], 0
+    for inventory in inventories:
+        cost = trials * max(len(inventory[0]), hours)
+        if batch and size + cost > MAX_BATCH:
+            yield batch
+            batch, size = [], 0
+        batch.append(inventory)
+        size += cost
+    if batch:
+        yield batch
+
+
+def _prepare(items, start_ts):
+    '''
+    Return the seconds until each item is available (negative if it
+    already is) and its stage, for items that are being reviewed
+
+    Items are sorted so a seed gives the same results whatever order they
+    were fetched in.
+    '''
+    pairs = []
+    for item in items:
+        if not item.next_review or not 0 < item.srs_numeric < BURNED:
+            continue
+        if item._raw is not None:
+            # Cheaper than converting next_review back to a timestamp
+            ts = item._raw['user_specific']['available_date']
+        else:
+            ts = _timestamp(item.next_review)
+        pairs.append((ts - start_ts, item.srs_numeric))
+    pairs.sort()
+    available = [ts for ts, _ in pairs]
+    stages = [stage for _, stage in pairs]
+    return available, stages
+
+
+def _result(start, counts, days, day_starts):
+    '''
+    Build a forecast from the reviews per hour in each trial
+    '''
+    if numpy is not None:
+        return ReviewForecast(
+            start,
+            counts.mean(axis=0),
+            days,
+            numpy.add.reduceat(counts, day_starts, axis=1),
+        )
+    bounds = day_starts + [len(counts[0])]
+    daily = [
+        [sum(row[bounds[i]:bounds[i + 1]]) for i in range(len(day_starts))]
+        for row in counts
+    ]
+    hourly = [float(sum(col)) / len(col) for col in zip(*counts)]
+    return ReviewForecast(start, hourly, days, daily)
+
+
+def _simulate_numpy(batch, hours, trials, accuracy, interval, rng):
+    '''
+    :return: Array of reviews per (user, trial, hour)
+    '''
+    # Batches are kept small enough for every value to fit in 32 bits
+    dtype = 'int32'
+    horizon = hours * HOUR
+    accuracy = numpy.array(accuracy, dtype='float32')
+    interval = numpy.array(interval, dtype=dtype)
+    # Stage an item drops to after a wrong answer
+    demoted = numpy.array(
+        [max(1, stage - (1 if stage < 5 else 2)) for stage in range(BURNED + 1)], dtype=dtype
+    )
+
+    sizes = [len(available) for available, _ in batch]
+    available = numpy.concatenate([numpy.array(a, dtype=dtype) for a, _ in batch])
+    stages = numpy.concatenate([numpy.array(s, dtype=dtype) for _, s in batch])
+    users = numpy.repeat(numpy.arange(len(batch), dtype=dtype), sizes)
+
+    # One entry per (trial, item), with the row of the counts it goes into
+    n = len(available)
+    # Anything already available is reviewed in the first hour
+    ts = numpy.tile(numpy.maximum(available, 0), trials)
+    stage = numpy.tile(stages, trials)
+    row = numpy.tile(users * trials, trials) + numpy.repeat(numpy.arange(trials, dtype=dtype), n)
+    row *= hours
+
+    # Bucket of every review, counted in one go at the end
+    buckets = []
+    keep = ts < horizon
+    ts, stage, row = ts[keep], stage[keep], row[keep]
+    while len(ts):
+        buckets.append(row + ts // HOUR)
+
+        correct = rng.random_sample(len(stage)).astype('float32') < accuracy[stage]
+        stage = numpy.where(correct, stage + 1, demoted[stage])
+        ts += interval[stage]
+
+        keep = (stage < BURNED) & (ts < horizon)
+        ts, stage, row = ts[keep], stage[keep], row[keep]
+
+    counts = numpy.bincount(
+        numpy.concatenate(buckets) if buckets else numpy.zeros(0, dtype=dtype),
+        minlength=len(batch) * trials * hours,
+    )
+    return counts.reshape(len(batch), trials, hours)
+
+
+def _simulate_python(available, stages, hours, trials, accuracy, interval, rand):
+    '''
+    :return: Reviews per hour, one list per trial
+    '''
+    horizon = hours * HOUR
+    counts = []
+    for _ in range(trials):
+        row = [0] * hours
+        for ts, stage in zip(available, stages):
+            ts = max(0, ts)
+            while ts < horizon:
+                row[ts // HOUR] += 1
+                if rand.random() < accuracy[stage]:
+                    stage += 1
+                else:
+                    stage = max(1, stage - (1 if stage < 5 else 2))
+                if stage >= BURNED:
+                    break
+                ts += interval[stage]
+        counts.append(row)
+    return counts
@@ -0,0 +1,120 @@
+'''
+Minimal iCalendar (RFC 5545) writer
+
+Only covers what the calendar feeds need: one VCALENDAR of VEVENTs with
+text, date and datetime properties. Events are written as they are produced
+so a calendar can be streamed without building it all in memory first.
+'''
+import datetime
+
+__all__ = ['calendar', 'escape', 'fold']
+
+CRLF = b'\r\n'
+# Longest a content line may be, in octets, before it has to be folded
+LINE_LIMIT = 75
+# Events written per chunk when streaming
+DEFAULT_CHUNK_SIZE = 64
+
+try:
+    text_type = unicode
+except NameError:
+    text_type = str
+
+
+def escape(text):
+    '''
+    Escape a TEXT value
+    '''
+    return (
+        text.replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def fold(line):
+    '''
+    Fold an encoded content line so no line is longer than 75 octets
+
+    Continuation lines start with a space. Lines are only split between
+    characters, never inside a multi-byte UTF-8 sequence.
+    '''
+    if len(line) <= LINE_LIMIT:
+        return line
+    parts = []
+    limit = LINE_LIMIT
+    while len(line) > limit:
+        cut = limit
+        # Back up to the start of a UTF-8 character
+        while cut > 0 and (ord(line[cut:cut + 1]) & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(line[:cut])
+        line = line[cut:]
+        # The leading space of a continuation line counts towards the limit
+        limit = LINE_LIMIT - 1
+    parts.append(line)
+    return (CRLF + b' ').join(parts)
+
+
+def content_line(name, value):
+    '''
+    Return one property as an encoded and folded content line
+    '''
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(UTC).replace(tzinfo=None)
+            text = value.strftime('%Y%m%dT%H%M%SZ')
+        else:
+            # Floating time, shown in whatever timezone the reader is in
+            text = value.strftime('%Y%m%dT%H%M%S')
+    elif isinstance(value, datetime.date):
+        name += ';VALUE=DATE'
+        text = value.strftime('%Y%m%d')
+    elif isinstance(value, bytes):
+        text = escape(value.decode('utf8'))
+    else:
+        text = escape(text_type(value))
+    return fold(u'{0}:{1}'.format(name, text).encode('utf8')) + CRLF
+
+
+def calendar(prodid, events, chunk_size=DEFAULT_CHUNK_SIZE):
+    '''
+    Yield a calendar as chunks of encoded bytes
+
+    :param prodid: Identifier of the product that made the calendar
+    :param events: Iterable of events, each a list of (name, value) pairs
+    :param chunk_size: Number of events written per chunk
+    '''
+    chunk = [
+        b'BEGIN:VCALENDAR' + CRLF,
+        content_line('VERSION', '2.0'),
+        content_line('PRODID', prodid),
+    ]
+    count = 0
+    for properties in events:
+        chunk.append(b'BEGIN:VEVENT' + CRLF)
+        for name, value in properties:
+            chunk.append(content_line(name, value))
+        chunk.append(b'END:VEVENT' + CRLF)
+        count += 1
+        if count % chunk_size == 0:
+            yield b''.join(chunk)
+            chunk = []
+    chunk.append(b'END:VCALENDAR' + CRLF)
+    yield b''.join(chunk)
+
+
+class _UTC(datetime.tzinfo):
+    def utcoffset(self, dt):
+        return datetime.timedelta(0)
+
+    def tzname(self, dt):
+        return 'UTC'
+
+    def dst(self, dt):
+        return datetime.timedelta(0)
+
+
+UTC = _UTC()
@@ -0,0 +1,136 @@
+'''
+Counters and histograms for what the clients spend their time on
+
+Instrumentation is off by default. Assign a :class:`Metrics` to
+``WaniKani.metrics`` (or to a subclass or a single client) to turn it on::
+
+    from wanikani.core import WaniKani
+    from wanikani.metrics import Metrics
+
+    WaniKani.metrics = Metrics()
+    ...
+    print(WaniKani.metrics.prometheus())
+
+While it is None the clients skip every measurement, so leaving the hooks in
+place costs a single attribute check per request.
+'''
+import bisect
+import collections
+import threading
+
+__all__ = ['Metrics']
+
+# Upper bounds (in seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Name, type and help text for everything the clients record
+DESCRIPTIONS = {
+    'wanikani_requests_total': ('counter', 'HTTP requests sent, by endpoint and status'),
+    'wanikani_request_errors_total': ('counter', 'Requests that failed to connect or timed out'),
+    'wanikani_retries_total': ('counter', 'Requests that were retried'),
+    'wanikani_request_seconds': ('histogram', 'Time from sending a request to having the whole body'),
+    'wanikani_response_wait_seconds': ('histogram', 'Time from sending a request to receiving the headers'),
+    'wanikani_response_bytes_total': ('counter', 'Response body bytes received'),
+    'wanikani_decode_seconds': ('histogram', 'Time spent decoding JSON responses'),
+    'wanikani_memo_hits_total': ('counter', 'Responses answered from a client\'s memo'),
+    'wanikani_items_total': ('counter', 'Radical, kanji and vocabulary objects built from responses'),
+    'wanikani_cache_total': ('counter', 'Cache lookups, by endpoint and result'),
+}
+
+
+class Histogram(object):
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # The last count is for values above every bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics(object):
+    '''
+    Thread safe store of labelled counters and histograms
+    '''
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counters = collections.defaultdict(int)
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] += value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(self.buckets)
+            self.histograms[key].observe(value)
+
+    def get(self, name, **labels):
+        '''
+        Return the value of a counter, or the count of a histogram
+        '''
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            if key in self.histograms:
+                return self.histograms[key].count
+            return self.counters.get(key, 0)
+
+    def clear(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def prometheus(self):
+        '''
+        Return everything recorded in the Prometheus text exposition format
+        '''
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(
+                (key, list(h.counts), h.sum, h.count) for key, h in self.histograms.items()
+            )
+
+        lines = []
+        described = set()
+
+        def describe(name, default):
+            if name not in described:
+                described.add(name)
+                kind, text = DESCRIPTIONS.get(name, (default, name))
+                lines.append('# HELP {0} {1}'.format(name, text))
+                lines.append('# TYPE {0} {1}'.format(name, kind))
+
+        for (name, labels), value in counters:
+            describe(name, 'counter')
+            lines.append('{0}{1} {2}'.format(name, format_labels(labels), value))
+
+        for (name, labels), counts, total, count in histograms:
+            describe(name, 'histogram')
+            cumulative = 0
+            for bound, n in zip(self.buckets + ('+Inf',), counts):
+                cumulative += n
+                lines.append('{0}_bucket{1} {2}'.format(
+                    name, format_labels(labels + (('le', str(bound)),)), cumulative
+                ))
+            lines.append('{0}_sum{1} {2!r}'.format(name, format_labels(labels), total))
+            lines.append('{0}_count{1} {2}'.format(name, format_labels(labels), count))
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        '{0}="{1}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    ) + '}'
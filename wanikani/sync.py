@@ -0,0 +1,224 @@
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from wanikani.cache import CACHE_PATH, makedirs
+from wanikani.core import Kanji, Radical, Vocabulary, WaniKani
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['SyncStore', 'SyncedWaniKani']
+
+SYNC_PATH = os.path.join(CACHE_PATH, 'sync.sqlite3')
+
+TYPES = {
+    Radical: 'radical',
+    Kanji: 'kanji',
+    Vocabulary: 'vocabulary',
+}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS items (
+    user TEXT NOT NULL,
+    type TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    available_date INTEGER NOT NULL,
+    raw TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_level ON items (user, type, level);
+CREATE INDEX IF NOT EXISTS items_available ON items (user, available_date);
+CREATE TABLE IF NOT EXISTS users (
+    user TEXT PRIMARY KEY,
+    level INTEGER NOT NULL,
+    synced INTEGER NOT NULL
+);
+'''
+
+
+class SyncStore(object):
+    '''
+    SQLite copy of each user's radicals, kanji and vocabulary
+
+    Users are stored under a hash of their API key. Items are replaced a
+    whole level at a time, so the store only needs to know which levels may
+    have changed since the last sync.
+    '''
+
+    def __init__(self, path=SYNC_PATH):
+        if path != ':memory:' and os.path.dirname(path):
+            makedirs(os.path.dirname(path))
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def user(api_key):
+        return hashlib.sha1(api_key.encode('utf8')).hexdigest()
+
+    def stale_levels(self, api_key, level, hints=()):
+        '''
+        Return the levels that need to be fetched again, or None if the user
+        has never been synced and everything needs loading
+
+        An item can only change when it is reviewed, which is only possible
+        once its available_date has passed. Current level items, level ups
+        and any levels passed in as hints (such as recent unlocks) are always
+        refreshed too.
+        '''
+        user = self.user(api_key)
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT level FROM users WHERE user = ?', (user,)
+            ).fetchone()
+            if row is None:
+                return None
+            due = self.connection.execute(
+                'SELECT DISTINCT level FROM items '
+                'WHERE user = ? AND available_date > 0 AND available_date <= ?',
+                (user, int(time.time()))
+            ).fetchall()
+
+        levels = set(lvl for lvl, in due)
+        levels.update(hints)
+        levels.update(range(min(row[0], level), level + 1))
+        return sorted(lvl for lvl in levels if 0 < lvl <= level)
+
+    def synced(self, api_key):
+        '''
+        Return when the user was last synced, or None if they never were
+        '''
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT synced FROM users WHERE user = ?', (self.user(api_key),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def replace(self, api_key, level, levels, items):
+        '''
+        Replace the stored items for the given levels
+
+        Anything above the user's current level is removed as well, so items
+        from before a level reset do not linger.
+
+        :param levels: Levels that were fetched, or None if all of them were
+        :param items: Items that were fetched
+        '''
+        user = self.user(api_key)
+        rows = [(
+            user,
+            TYPES[item.__class__],
+            item.level,
+            item['available_date'] or 0,
+            json.dumps(item.raw),
+        ) for item in items]
+
+        with self.lock, self.connection:
+            if levels is None:
+                self.connection.execute('DELETE FROM items WHERE user = ?', (user,))
+            else:
+                self.connection.executemany(
+                    'DELETE FROM items WHERE user = ? AND level = ?',
+                    [(user, lvl) for lvl in levels]
+                )
+                self.connection.execute(
+                    'DELETE FROM items WHERE user = ? AND level > ?', (user, level)
+                )
+            self.connection.executemany('INSERT INTO items VALUES (?, ?, ?, ?, ?)', rows)
+            self.connection.execute(
+                'INSERT OR REPLACE INTO users VALUES (?, ?, ?)',
+                (user, level, int(time.time()))
+            )
+        logger.debug('Stored %d items for %s levels', len(rows), 'all' if levels is None else levels)
+
+    def items(self, api_key, klass, levels=None, keep_raw=True):
+        query = 'SELECT raw FROM items WHERE user = ? AND type = ?'
+        params = [self.user(api_key), TYPES[klass]]
+        if levels:
+            levels = [int(lvl) for lvl in str(levels).split(',')]
+            query += ' AND level IN ({0})'.format(','.join('?' * len(levels)))
+            params += levels
+        query += ' ORDER BY level'
+
+        with self.lock:
+            rows = self.connection.execute(query, params).fetchall()
+        for raw, in rows:
+            yield klass(json.loads(raw), keep_raw)
+
+
+class SyncedWaniKani(WaniKani):
+    '''
+    WaniKani client that reads items from a :class:`SyncStore`
+
+    The first time items are requested the store is brought up to date with
+    :meth:`sync`, which only downloads the levels that may have changed.
+
+    :param max_age: Seconds a sync is trusted for. If the user was synced
+        more recently than this the stored items are used as they are.
+    '''
+    max_age = 0
+
+    def __init__(self, api_key, store=None, max_age=None, **kwargs):
+        super(SyncedWaniKani, self).__init__(api_key, **kwargs)
+        self.store = store or SyncStore()
+        if max_age is not None:
+            self.max_age = max_age
+        # None until we know whether the store is recent enough to use
+        self.synced = None
+        self._sync_lock = threading.Lock()
+
+    def sync(self):
+        level = self.profile()['level']
+        hints = [item.level for item in super(SyncedWaniKani, self).recent_unlocks()]
+        levels = self.store.stale_levels(self.api_key, level, hints)
+
+        if levels is None:
+            logger.info('Loading all levels')
+            chunks = [None]
+        else:
+            logger.info('Refreshing levels %s', levels)
+            # Keep each request to a handful of levels to avoid timeouts
+            chunks = [
+                ','.join(str(lvl) for lvl in levels[i:i + 10])
+                for i in range(0, len(levels), 10)
+            ]
+
+        upstream = (
+            super(SyncedWaniKani, self).radicals,
+            super(SyncedWaniKani, self).kanji,
+            super(SyncedWaniKani, self).vocabulary,
+        )
+        items = []
+        with concurrent.futures.ThreadPoolExecutor(len(upstream)) as executor:
+            for chunk in chunks:
+                for result in executor.map(lambda method: list(method(chunk)), upstream):
+                    items.extend(result)
+        self.store.replace(self.api_key, level, levels, items)
+        self.synced = True
+
+    def invalidate(self, url=None):
+        super(SyncedWaniKani, self).invalidate(url)
+        if url is None:
+            self.synced = False
+
+    def _items(self, klass, levels):
+        with self._sync_lock:
+            if self.synced is None and self.max_age:
+                synced = self.store.synced(self.api_key)
+                self.synced = synced is not None and time.time() - synced < self.max_age
+            if not self.synced:
+                self.sync()
+        return self.store.items(self.api_key, klass, levels, self.keep_raw)
+
+    def radicals(self, levels=None):
+        return self._items(Radical, levels)
+
+    def kanji(self, levels=None):
+        return self._items(Kanji, levels)
+
+    def vocabulary(self, levels=None):
+        return self._items(Vocabulary, levels)
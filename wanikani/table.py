@@ -0,0 +1,179 @@
+import array
+import collections
+import datetime
+import time
+
+from wanikani.core import Kanji, Radical, Vocabulary
+
+# If numpy is installed the columns are stored as numpy arrays and grouping is
+# done with vectorized operations. Otherwise we fall back to the standard
+# library array module and count in Python.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__all__ = ['ItemTable']
+
+TYPES = (Radical, Kanji, Vocabulary)
+
+# Python 2 arrays have no 64 bit typecode, so timestamps use long there
+try:
+    TIMESTAMP = array.array('q').typecode
+except ValueError:
+    TIMESTAMP = 'l'
+
+# Column name and array typecode. Dates are unix timestamps with 0 meaning
+# the item does not have one.
+COLUMNS = (
+    ('type', 'b'),
+    ('level', 'h'),
+    ('srs_numeric', 'b'),
+    ('available_date', TIMESTAMP),
+    ('unlocked_date', TIMESTAMP),
+    ('burned_date', TIMESTAMP),
+)
+
+
+class ItemTable(object):
+    '''
+    Column oriented store of the fields needed to aggregate reviews
+
+    Rather than holding one object per item, each field is kept in its own
+    array so filtering and counting a whole inventory is a handful of array
+    operations.
+    '''
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    @classmethod
+    def from_items(cls, items):
+        columns = dict((name, array.array(code)) for name, code in COLUMNS)
+        index = dict((klass, i) for i, klass in enumerate(TYPES))
+        for item in items:
+            columns['type'].append(index[item.__class__])
+            columns['level'].append(item.level or 0)
+            columns['srs_numeric'].append(item.srs_numeric or 0)
+            columns['available_date'].append(_timestamp(item.next_review) if item.next_review else 0)
+            columns['unlocked_date'].append(item.unlocked or 0)
+            columns['burned_date'].append(item.burned or 0)
+        if numpy is not None:
+            columns = dict((name, numpy.array(col, dtype=col.typecode)) for name, col in columns.items())
+        return cls(columns)
+
+    def __len__(self):
+        return len(self.columns['type'])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def _take(self, mask):
+        if numpy is not None:
+            return ItemTable(dict((name, col[mask]) for name, col in self.columns.items()))
+        return ItemTable(dict(
+            (name, array.array(col.typecode, [v for v, keep in zip(col, mask) if keep]))
+            for name, col in self.columns.items()
+        ))
+
+    def filter(self, items=None, levels=None, srs_numeric=None, before=None, after=None, column='available_date'):
+        '''
+        Return a new table with only the matching rows
+
+        :param items: Item classes to keep
+        :param levels: Levels to keep
+        :param srs_numeric: SRS stages to keep
+        :param before: Keep rows where column is before this datetime
+        :param after: Keep rows where column is at or after this datetime
+        :param column: Date column used by before and after
+        '''
+        conditions = []
+        if items is not None:
+            conditions.append(('type', [TYPES.index(klass) for klass in items]))
+        if levels is not None:
+            conditions.append(('level', list(levels)))
+        if srs_numeric is not None:
+            conditions.append(('srs_numeric', list(srs_numeric)))
+
+        before = _timestamp(before) if before else None
+        after = _timestamp(after) if after else None
+
+        if numpy is not None:
+            mask = numpy.ones(len(self), dtype=bool)
+            for name, values in conditions:
+                mask &= numpy.isin(self.columns[name], values)
+            if before is not None:
+                mask &= (self.columns[column] > 0) & (self.columns[column] < before)
+            if after is not None:
+                mask &= self.columns[column] >= after
+            return self._take(mask)
+
+        mask = [True] * len(self)
+        for name, values in conditions:
+            values = set(values)
+            mask = [keep and v in values for keep, v in zip(mask, self.columns[name])]
+        if before is not None:
+            mask = [keep and 0 < v < before for keep, v in zip(mask, self.columns[column])]
+        if after is not None:
+            mask = [keep and v >= after for keep, v in zip(mask, self.columns[column])]
+        return self._take(mask)
+
+    def count(self):
+        '''
+        Count the rows for each item type
+        '''
+        if numpy is not None:
+            counts = numpy.bincount(self.columns['type'], minlength=len(TYPES))
+        else:
+            counts = collections.Counter(self.columns['type'])
+        return dict((klass, int(counts[i])) for i, klass in enumerate(TYPES))
+
+    def _counts(self, types, keys):
+        if numpy is not None:
+            # Pack the type into the low bits so a single unique() gives us
+            # the count for every (timestamp, type) pair
+            packed = keys.astype('int64') * len(TYPES) + types
+            values, counts = numpy.unique(packed, return_counts=True)
+            return dict(
+                ((int(v) % len(TYPES), int(v) // len(TYPES)), int(n))
+                for v, n in zip(values, counts)
+            )
+        return collections.Counter(zip(types, keys))
+
+    def group_by(self, bucket, column='available_date'):
+        '''
+        Count rows of each item type per bucket of a date column
+
+        :param bucket: Function converting a local datetime to its bucket
+        :return: Ordered mapping of bucket to a dict of counts per item type
+        '''
+        keys = self.columns[column]
+        types = self.columns['type']
+        if numpy is not None:
+            mask = keys > 0
+            keys, types = keys[mask], types[mask]
+        else:
+            types = [t for t, k in zip(types, keys) if k > 0]
+            keys = [k for k in keys if k > 0]
+
+        # Only the distinct timestamps need converting to datetimes, and
+        # reviews are scheduled on a small number of them
+        buckets = {}
+        for (index, ts), n in self._counts(types, keys).items():
+            key = bucket(datetime.datetime.fromtimestamp(ts))
+            if key not in buckets:
+                buckets[key] = dict((klass, 0) for klass in TYPES)
+            buckets[key][TYPES[index]] += n
+        return collections.OrderedDict(sorted(buckets.items()))
+
+    def group_by_hour(self, column='available_date'):
+        return self.group_by(lambda ts: ts.replace(minute=0, second=0, microsecond=0), column)
+
+    def group_by_day(self, column='available_date'):
+        return self.group_by(lambda ts: ts.date(), column)
+
+
+def _timestamp(ts):
+    if isinstance(ts, datetime.datetime):
+        return int(time.mktime(ts.timetuple()))
+    return int(ts)